@@ -1,11 +1,11 @@
-import json
-from a3.algorithms.object_detection import BoundingBoxMatcher
-from a3.utils.draw.object_detection import draw_bounding_boxes_in_video
-from a3.utils.io import load_obj_each_frame
-from a3.utils.draw.object_tracking import draw_target_object_tracks
-from a3.utils.io.object_tracking import save_target_object_centers
-from a3.utils.io.object_detection import save_bounding_boxes
-from a3.algorithms.object_tracking import AlphaBetaFilter2D
+from object_tracking.algorithms.object_detection import BoundingBoxMatcher
+from object_tracking.utils.draw.object_detection import draw_bounding_boxes_in_video
+from object_tracking.utils.io import load_obj_each_frame
+from object_tracking.utils.draw.object_tracking import draw_target_object_tracks
+from object_tracking.utils.io.object_tracking import save_target_object_centers
+from object_tracking.utils.io.object_detection import save_bounding_boxes
+from object_tracking.algorithms.object_tracking import AlphaBetaFilter2D
+from object_tracking.utils.video import FrameCache
 import numpy as np
 
 if __name__ == "__main__":
@@ -13,6 +13,9 @@ if __name__ == "__main__":
     fps = 30
     dt = 1.0 / fps
 
+    # Decode and resize the video once for both renders
+    frames = FrameCache("./data/cropped/commonwealth.mp4", width=700, height=500)
+
     coords = np.array(frame_dict["obj"])
 
     alpha_beta_filter_2d = AlphaBetaFilter2D(
@@ -36,7 +39,7 @@ if __name__ == "__main__":
         width=700,
         height=500,
         object_centers=corrected_measurements,
-        source_video="./data/cropped/commonwealth.mp4",
+        source_video=frames,
         save_path="./data/submission/part_1_demo.mp4",
     )
 
@@ -60,6 +63,6 @@ if __name__ == "__main__":
         width=700,
         height=500,
         bounding_boxes=bounding_boxes,
-        source_video="./data/cropped/commonwealth.mp4",
+        source_video=frames,
         save_path="./data/submission/part_2_demo.mp4",
     )
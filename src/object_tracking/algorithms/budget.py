@@ -0,0 +1,258 @@
+import math
+from statistics import NormalDist
+from typing import Dict, Optional, Sequence, Set
+
+# Association paths of BoundingBoxMatcher, from the most accurate to the cheapest
+PATHS = ("exact", "greedy", "gated", "coast")
+
+# Prior (seconds per unit of work, exponent) of each path, fitted on tracking scenes of 10 to 1000
+# objects with the default matcher, the work being defined by LatencyBudget.work
+PRIORS = {
+    "exact": (2e-7, 0.95),
+    "greedy": (7.5e-9, 1.1),
+    "gated": (5e-7, 1.0),
+    # The stages after association: filter corrections, births and pruning, mostly fixed overhead
+    "rest": (1.6e-5, 0.5),
+}
+
+
+class CostModel:
+    def __init__(
+        self,
+        scale: float,
+        exponent: float,
+        decay: float = 0.05,
+        ridge: float = 1.0,
+        residual: float = 0.1,
+    ) -> None:
+        """Predicts the time of a computation from its size as seconds = scale * work ** exponent.
+
+        The line log(seconds) = log(scale) + exponent * log(work) is fitted online by exponentially
+        weighted least squares, its slope shrunk towards the prior exponent so frames of similar
+        size do not make it unstable, and the spread of the observations around it is tracked to
+        predict quantiles rather than the mean.
+
+        Parameters
+        ----------
+        scale : float
+            Prior seconds per unit of work.
+        exponent : float
+            Prior growth of the time with the work.
+        decay : float, optional
+            Weight of each new observation, by default 0.05
+        ridge : float, optional
+            Strength of the prior exponent, in units of the variance of log(work), by default 1.0
+        residual : float, optional
+            Prior variance of log(seconds) around the line, by default 0.1
+        """
+        self.prior_intercept = math.log(scale)
+        self.prior_exponent = exponent
+        self.decay = decay
+        self.ridge = ridge
+        self.residual = residual
+        self.observations = 0
+        self.mean_x = self.mean_y = self.var_x = self.cov_xy = 0.0
+
+    def _line(self):
+        if self.observations == 0:
+            return self.prior_intercept, self.prior_exponent
+        slope = (self.cov_xy + self.ridge * self.prior_exponent) / (
+            self.var_x + self.ridge
+        )
+        return self.mean_y - slope * self.mean_x, slope
+
+    def predict(self, work: float, z: float = 0.0) -> float:
+        """Returns the predicted seconds, z standard deviations above the typical time."""
+        intercept, slope = self._line()
+        x = math.log(max(work, 1.0))
+        return math.exp(intercept + slope * x + z * math.sqrt(self.residual))
+
+    def observe(self, work: float, seconds: float) -> None:
+        """Updates the fit with the measured seconds of a computation of the given work."""
+        x, y = math.log(max(work, 1.0)), math.log(max(seconds, 1e-7))
+        intercept, slope = self._line()
+        d = self.decay
+        if self.observations == 0:
+            # The distance to the prior line is its error rather than noise
+            self.mean_x, self.mean_y = x, y
+        else:
+            self.residual += d * ((y - intercept - slope * x) ** 2 - self.residual)
+            dx, dy = x - self.mean_x, y - self.mean_y
+            self.mean_x += d * dx
+            self.mean_y += d * dy
+            self.var_x = (1 - d) * (self.var_x + d * dx * dx)
+            self.cov_xy = (1 - d) * (self.cov_xy + d * dx * dy)
+        self.observations += 1
+
+
+class LatencyBudget:
+    def __init__(
+        self,
+        budget: float,
+        paths: Sequence[str] = ("exact", "greedy", "gated"),
+        gate_distance: Optional[float] = None,
+        quantile: float = 0.99,
+        probe_interval: int = 30,
+        decay: float = 0.05,
+    ) -> None:
+        """Picks the most accurate association of each frame that fits in a time budget.
+
+        Before associating a frame, the time of every path is predicted from the number of tracks
+        and detections with a CostModel per path, at the given quantile of its past times, and the
+        first of paths predicted to finish within the budget, together with the rest of the update,
+        is taken. When none fits, the frame is coasted. The models learn from the measured time of
+        every frame. A path that was skipped for probe_interval frames is retried once its typical
+        time fits, so a slow frame does not keep it disabled.
+
+        The paths are
+        - "exact": the configured matcher of BoundingBoxMatcher
+        - "greedy": nearest-first matching of the dense cost matrix, with GreedyMatcher
+        - "gated": nearest-first matching of only the pairs within gate_distance, without a dense matrix
+        - "coast": no association, every track keeps its filter prediction and skips the frame, and
+          detections are left without a track (MISSING_VALUE)
+
+        Parameters
+        ----------
+        budget : float
+            Time allowed for each update (seconds).
+        paths : Sequence[str], optional
+            Paths to try before coasting, in order of preference, by default ("exact", "greedy", "gated")
+        gate_distance : Optional[float], optional
+            Gate distance (pixels) of the "gated" path, by default that of the BoundingBoxMatcher. Without
+            either, the path is not taken.
+        quantile : float, optional
+            Quantile of the predicted times compared with the budget, by default 0.99
+        probe_interval : int, optional
+            Number of frames a path is skipped before its typical time is enough to take it, by default 30
+        decay : float, optional
+            Weight of each frame in the cost models, by default 0.05
+        """
+        unknown = set(paths) - set(PATHS)
+        if unknown:
+            raise ValueError(
+                f"Unknown paths {sorted(unknown)}, expected some of {list(PATHS)}"
+            )
+        self.budget = budget
+        self.paths = list(paths)
+        self.gate_distance = gate_distance
+        self.z = NormalDist().inv_cdf(quantile)
+        self.probe_interval = probe_interval
+        self.models = {
+            name: CostModel(*prior, decay=decay) for name, prior in PRIORS.items()
+        }
+        self.skipped = dict.fromkeys(PATHS, 0)
+        # Number of frames that took each path, and the path of the last frame
+        self.counts: Dict[str, int] = dict.fromkeys(PATHS, 0)
+        self.path: Optional[str] = None
+        # Paths that ran at least once, and "rest"
+        self.loaded: Set[str] = set()
+        self.solves_rows = True
+
+    def work(self, path: str, num_tracks: int, num_detections: int) -> float:
+        """Size of the work of a path, the unit of its CostModel."""
+        if path == "exact":
+            if self.solves_rows:
+                # The solver searches the whole matrix again for each track left without a detection
+                excess = max(num_tracks - num_detections, 0)
+                return num_tracks * num_detections * (1 + excess)
+            return num_tracks * num_detections
+        if path == "greedy":
+            return num_tracks * num_detections
+        return num_tracks + num_detections
+
+    def estimate(
+        self, path: str, num_tracks: int, num_detections: int, z: float = 0.0
+    ) -> float:
+        """Returns the predicted seconds of a path, z standard deviations above its typical time."""
+        if path == "coast":
+            return 0.0
+        return self.models[path].predict(self.work(path, num_tracks, num_detections), z)
+
+    def choose(
+        self,
+        num_tracks: int,
+        num_detections: int,
+        gate_distance: Optional[float],
+        solves_rows: bool = True,
+    ) -> str:
+        """Returns the path to associate a frame with and records it as the path of the frame.
+
+        Parameters
+        ----------
+        num_tracks : int
+            Number of tracks.
+        num_detections : int
+            Number of detections of the frame.
+        gate_distance : Optional[float]
+            Gate distance of the BoundingBoxMatcher, used by "gated" if the budget has none.
+        solves_rows : bool, optional
+            Whether the exact path runs one phase per track, which makes the tracks in excess of the
+            detections expensive, as the default Hungarian solver does on a dense matrix, by default True
+
+        Returns
+        -------
+        path : str
+            One of PATHS.
+        """
+        self.solves_rows = solves_rows
+        # "gated" is not taken without a gate distance
+        paths = [
+            path
+            for path in self.paths
+            if path != "gated"
+            or self.gate_distance is not None
+            or gate_distance is not None
+        ]
+        chosen = "coast"
+        if num_tracks == 0 or num_detections == 0:
+            # Nothing to associate
+            chosen = paths[0] if paths else "coast"
+        else:
+            remaining = self.budget - self.models["rest"].predict(
+                self.work("rest", num_tracks, num_detections), self.z
+            )
+            for path in paths:
+                z = self.z if self.skipped[path] < self.probe_interval else 0.0
+                if self.estimate(path, num_tracks, num_detections, z) <= remaining:
+                    chosen = path
+                    break
+                self.skipped[path] += 1
+        self.skipped[chosen] = 0
+        self.counts[chosen] += 1
+        self.path = chosen
+        return chosen
+
+    def observe(
+        self,
+        path: str,
+        num_tracks: int,
+        num_detections: int,
+        association_seconds: float,
+        rest_seconds: float,
+    ) -> None:
+        """Updates the cost models with the measured times of a frame.
+
+        Parameters
+        ----------
+        path : str
+            Path the frame took.
+        num_tracks : int
+            Number of tracks before the frame.
+        num_detections : int
+            Number of detections of the frame.
+        association_seconds : float
+            Time of the cost computation and assignment.
+        rest_seconds : float
+            Time of the rest of the update.
+        """
+        measured = {"rest": (num_tracks + num_detections, rest_seconds)}
+        if path != "coast" and num_tracks and num_detections:
+            measured[path] = (
+                self.work(path, num_tracks, num_detections),
+                association_seconds,
+            )
+        for name, (work, seconds) in measured.items():
+            # The first run loads what it uses lazily, so it is not learned from
+            if name in self.loaded:
+                self.models[name].observe(work, seconds)
+            self.loaded.add(name)
@@ -0,0 +1,176 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from object_tracking.algorithms.matching import HungarianMatcher
+from object_tracking.algorithms.object_detection import BoundingBoxMatcher
+from object_tracking.utils.io.columnar import FrameDetections
+
+
+def chunk_ranges(
+    num_frames: int, chunk_size: int, overlap: int
+) -> List[Tuple[int, int, int]]:
+    """Splits frames into chunks that each start overlap frames before the frames they own.
+
+    Parameters
+    ----------
+    num_frames : int
+        Number of frames.
+    chunk_size : int
+        Number of frames owned by each chunk.
+    overlap : int
+        Number of frames each chunk tracks before its own frames, at most chunk_size.
+
+    Returns
+    -------
+    ranges : List[Tuple[int, int, int]]
+        (start, owned_start, end) of each chunk, tracking frames start:end and owning owned_start:end.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if not 0 <= overlap <= chunk_size:
+        raise ValueError("overlap must be between 0 and chunk_size")
+    return [
+        (
+            max(owned_start - overlap, 0),
+            owned_start,
+            min(owned_start + chunk_size, num_frames),
+        )
+        for owned_start in range(0, num_frames, chunk_size)
+    ]
+
+
+def _fit_chunk(
+    offsets: np.ndarray, boxes: np.ndarray, matcher_kwargs: Dict[str, Any]
+) -> np.ndarray:
+    matcher = BoundingBoxMatcher(None, **matcher_kwargs)
+    return matcher.fit_columnar(FrameDetections(offsets, boxes)).ids
+
+
+def stitch_ids(
+    previous_ids: np.ndarray, current_ids: np.ndarray, min_votes: int = 1
+) -> Dict[int, int]:
+    """Matches the tracks of two chunks that labelled the same detections of their overlap.
+
+    Parameters
+    ----------
+    previous_ids : np.ndarray
+        Array of shape (K,) of the identifiers given to the overlap detections by the earlier chunk.
+    current_ids : np.ndarray
+        Array of shape (K,) of the identifiers given to the same detections by the later chunk.
+    min_votes : int, optional
+        Minimum number of shared detections for two tracks to be stitched, by default 1
+
+    Returns
+    -------
+    mapping : Dict[int, int]
+        Identifier of the earlier chunk for each stitched identifier of the later chunk.
+    """
+    if len(current_ids) == 0:
+        return {}
+    previous, previous_index = np.unique(previous_ids, return_inverse=True)
+    current, current_index = np.unique(current_ids, return_inverse=True)
+    votes = np.zeros((len(current), len(previous)), dtype=np.int64)
+    np.add.at(votes, (current_index, previous_index), 1)
+
+    # Maximize the number of shared detections
+    row_inds, col_inds = HungarianMatcher()(votes.max() - votes)
+    accepted = votes[row_inds, col_inds] >= min_votes
+    return dict(
+        zip(
+            current[row_inds[accepted]].tolist(),
+            previous[col_inds[accepted]].tolist(),
+        )
+    )
+
+
+def renumber_by_first_appearance(ids: np.ndarray) -> np.ndarray:
+    """Renumbers identifiers 0, 1, ... in the order of their first detection, as the sequential tracker numbers them."""
+    unique_ids, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    order = np.empty(len(unique_ids), dtype=np.int64)
+    order[np.argsort(first, kind="stable")] = np.arange(len(unique_ids))
+    return order[inverse]
+
+
+def fit_chunked(
+    detections: FrameDetections,
+    chunk_size: int,
+    overlap: int = 30,
+    workers: Optional[int] = None,
+    min_votes: int = 1,
+    **matcher_kwargs,
+) -> FrameDetections:
+    """Tracks a long recording in overlapping chunks in parallel and stitches the track identifiers.
+
+    Each chunk is tracked by its own BoundingBoxMatcher in a separate process, starting overlap frames
+    before the frames it owns so its tracks are settled by then. The tracks of consecutive chunks are
+    stitched by matching the identifiers both gave to the detections of the overlap, and identifiers
+    are finally renumbered in order of first appearance. When every track that crosses a boundary is
+    detected in the overlap and the overlap is long enough for the later chunk to converge, the result
+    is the same as tracking sequentially.
+
+    Parameters
+    ----------
+    detections : FrameDetections
+        Bounding boxes of the object in each frame.
+    chunk_size : int
+        Number of frames owned by each chunk.
+    overlap : int, optional
+        Number of frames shared by consecutive chunks, at most chunk_size, by default 30
+    workers : Optional[int], optional
+        Number of worker processes, by default the number of CPUs. With 1 the chunks run in this process.
+    min_votes : int, optional
+        Minimum number of shared overlap detections for two tracks to be stitched, by default 1
+    **matcher_kwargs
+        Keyword arguments of BoundingBoxMatcher, e.g. max_distance_threshold, max_frame_skipped and fps.
+
+    Returns
+    -------
+    tracked_detections : FrameDetections
+        The same bounding boxes with the identifier of the track of each one.
+    """
+    offsets = np.asarray(detections.offsets)
+    ranges = chunk_ranges(len(detections), chunk_size, overlap)
+    jobs = [
+        (
+            offsets[start : end + 1] - offsets[start],
+            np.asarray(detections.boxes[offsets[start] : offsets[end]]),
+            matcher_kwargs,
+        )
+        for start, _, end in ranges
+    ]
+    if workers == 1:
+        chunk_ids = [_fit_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_ids = list(executor.map(_fit_chunk, *zip(*jobs)))
+
+    ids = np.empty(len(detections.boxes), dtype=np.int64)
+    next_id = 0
+    for (start, owned_start, end), local_ids in zip(ranges, chunk_ids):
+        # Local identifiers of the detections tracked by both this chunk and the previous one
+        num_overlap = offsets[owned_start] - offsets[start]
+        owned_ids = local_ids[num_overlap:]
+        # Tracks that settle early in the overlap can be replaced before it ends, so only
+        # the tracks that continue into the owned frames take part in the stitching
+        continuing = np.isin(local_ids[:num_overlap], owned_ids)
+        mapping = stitch_ids(
+            ids[offsets[start] : offsets[owned_start]][continuing],
+            local_ids[:num_overlap][continuing],
+            min_votes,
+        )
+
+        # Tracks that are not stitched get fresh identifiers
+        new_ids = np.setdiff1d(owned_ids, list(mapping))
+        mapping.update(zip(new_ids.tolist(), range(next_id, next_id + len(new_ids))))
+        next_id += len(new_ids)
+
+        keys = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+        values = np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))
+        order = np.argsort(keys)
+        ids[offsets[owned_start] : offsets[end]] = values[
+            order[np.searchsorted(keys[order], owned_ids)]
+        ]
+
+    return FrameDetections(
+        detections.offsets, detections.boxes, renumber_by_first_appearance(ids)
+    )
@@ -0,0 +1,290 @@
+from typing import Callable, Dict, Optional
+import numpy as np
+
+
+def box_centroids(boxes: np.ndarray) -> np.ndarray:
+    """Returns the centroids of bounding boxes.
+
+    Parameters
+    ----------
+    boxes : np.ndarray
+        Array of shape (..., 4) of bounding boxes as (x_min, y_min, width, height).
+
+    Returns
+    -------
+    centroids : np.ndarray
+        Array of shape (..., 2) of (x, y) centroids.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    return boxes[..., :2] + boxes[..., 2:4] / 2.0
+
+
+def _distance(points: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    diff = np.asarray(points, dtype=np.float64) - box_centroids(boxes)
+    return np.sqrt(np.einsum("...k,...k->...", diff, diff))
+
+
+def _intersection_union(boxes_a: np.ndarray, boxes_b: np.ndarray):
+    boxes_a = np.asarray(boxes_a, dtype=np.float64)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64)
+    a_min, a_max = boxes_a[..., :2], boxes_a[..., :2] + boxes_a[..., 2:4]
+    b_min, b_max = boxes_b[..., :2], boxes_b[..., :2] + boxes_b[..., 2:4]
+
+    overlap = np.clip(np.minimum(a_max, b_max) - np.maximum(a_min, b_min), 0.0, None)
+    intersection = overlap[..., 0] * overlap[..., 1]
+    area_a = boxes_a[..., 2] * boxes_a[..., 3]
+    area_b = boxes_b[..., 2] * boxes_b[..., 3]
+    union = area_a + area_b - intersection
+
+    enclosing = np.maximum(a_max, b_max) - np.minimum(a_min, b_min)
+    enclosing_area = enclosing[..., 0] * enclosing[..., 1]
+    return intersection, union, enclosing_area
+
+
+def _iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    intersection, union, _ = _intersection_union(boxes_a, boxes_b)
+    return np.divide(
+        intersection, union, out=np.zeros_like(intersection), where=union > 0
+    )
+
+
+def _giou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    intersection, union, enclosing_area = _intersection_union(boxes_a, boxes_b)
+    ious = np.divide(
+        intersection, union, out=np.zeros_like(intersection), where=union > 0
+    )
+    penalty = np.divide(
+        enclosing_area - union,
+        enclosing_area,
+        out=np.zeros_like(enclosing_area),
+        where=enclosing_area > 0,
+    )
+    return ious - penalty
+
+
+def centroid_distance(points: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Returns the pairwise L2 distance between points and the centroids of bounding boxes.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        Array of shape (T, 2) of (x, y) coordinates.
+    boxes : np.ndarray
+        Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height).
+
+    Returns
+    -------
+    distances : np.ndarray
+        Array of shape (T, D) of distances.
+    """
+    return _distance(np.asarray(points)[:, None, :], np.asarray(boxes)[None, :, :])
+
+
+def iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Returns the pairwise intersection over union of two sets of bounding boxes.
+
+    Parameters
+    ----------
+    boxes_a : np.ndarray
+        Array of shape (T, 4) of bounding boxes as (x_min, y_min, width, height).
+    boxes_b : np.ndarray
+        Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height).
+
+    Returns
+    -------
+    ious : np.ndarray
+        Array of shape (T, D) with values in [0, 1].
+    """
+    return _iou(np.asarray(boxes_a)[:, None, :], np.asarray(boxes_b)[None, :, :])
+
+
+def giou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Returns the pairwise generalized intersection over union of two sets of bounding boxes.
+
+    Parameters
+    ----------
+    boxes_a : np.ndarray
+        Array of shape (T, 4) of bounding boxes as (x_min, y_min, width, height).
+    boxes_b : np.ndarray
+        Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height).
+
+    Returns
+    -------
+    gious : np.ndarray
+        Array of shape (T, D) with values in [-1, 1].
+    """
+    return _giou(np.asarray(boxes_a)[:, None, :], np.asarray(boxes_b)[None, :, :])
+
+
+def _predicted_boxes(predictions: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    return np.concatenate(np.broadcast_arrays(predictions, sizes), axis=-1)
+
+
+def centroid_cost(
+    predictions: np.ndarray,
+    sizes: np.ndarray,
+    boxes: np.ndarray,
+    max_distance: Optional[float] = None,
+) -> np.ndarray:
+    """Distance from each prediction to each box centroid normalized by max_distance, by default the largest distance."""
+    distances = _distance(predictions, boxes)
+    if max_distance is None:
+        max_distance = distances.max(initial=0.0)
+    if max_distance > 0:
+        distances /= max_distance
+    return distances
+
+
+def iou_cost(
+    predictions: np.ndarray,
+    sizes: np.ndarray,
+    boxes: np.ndarray,
+    max_distance: Optional[float] = None,
+) -> np.ndarray:
+    """One minus the intersection over union of the predicted boxes and the boxes, in [0, 1]."""
+    return 1.0 - _iou(_predicted_boxes(predictions, sizes), boxes)
+
+
+def giou_cost(
+    predictions: np.ndarray,
+    sizes: np.ndarray,
+    boxes: np.ndarray,
+    max_distance: Optional[float] = None,
+) -> np.ndarray:
+    """One minus the generalized intersection over union rescaled to [0, 1]."""
+    return (1.0 - _giou(_predicted_boxes(predictions, sizes), boxes)) / 2.0
+
+
+# Each metric broadcasts (..., 2) predictions and sizes against (..., 4) boxes
+COST_METRICS: Dict[str, Callable[..., np.ndarray]] = {
+    "centroid": centroid_cost,
+    "iou": iou_cost,
+    "giou": giou_cost,
+}
+
+
+def cost_matrix(
+    predictions: np.ndarray,
+    sizes: np.ndarray,
+    boxes: np.ndarray,
+    metric: str = "centroid",
+    weights: Optional[Dict[str, float]] = None,
+    max_distance: Optional[float] = None,
+    paired: bool = False,
+) -> np.ndarray:
+    """Calculates the normalized cost matrix between tracks and detections.
+
+    Parameters
+    ----------
+    predictions : np.ndarray
+        Array of shape (T, 2) of track predictions. Box metrics anchor the predicted box at the prediction as (x_min, y_min).
+    sizes : np.ndarray
+        Array of shape (T, 2) of the (width, height) of the last bounding box matched to each track.
+    boxes : np.ndarray
+        Array of shape (D, 4) of detected bounding boxes as (x_min, y_min, width, height).
+    metric : str, optional
+        One of "centroid", "iou", "giou" or "mix", by default "centroid"
+    weights : Optional[Dict[str, float]], optional
+        Weight of each metric when metric is "mix", e.g. {"centroid": 0.5, "iou": 0.5}, by default None
+    max_distance : Optional[float], optional
+        Distance that normalizes the centroid metric to 1, by default the largest distance in the matrix
+    paired : bool, optional
+        Whether to only compute the cost of each track with the detection at the same index (T == D), by default False
+
+    Returns
+    -------
+    cost_matrix : np.ndarray
+        Array of shape (T, D), or (T,) when paired, with values in [0, 1].
+    """
+    predictions = np.asarray(predictions, dtype=np.float64)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if not paired:
+        predictions, sizes = predictions[:, None, :], sizes[:, None, :]
+        boxes = boxes[None, :, :]
+
+    if metric != "mix":
+        if metric not in COST_METRICS:
+            raise ValueError(
+                f"Unknown metric '{metric}', expected one of {list(COST_METRICS) + ['mix']}"
+            )
+        return COST_METRICS[metric](predictions, sizes, boxes, max_distance)
+
+    if not weights:
+        raise ValueError("weights are required when metric is 'mix'")
+    costs = np.zeros(np.broadcast_shapes(predictions.shape[:-1], boxes.shape[:-1]))
+    for name, weight in weights.items():
+        if name not in COST_METRICS:
+            raise ValueError(
+                f"Unknown metric '{name}', expected one of {list(COST_METRICS)}"
+            )
+        costs += weight * COST_METRICS[name](predictions, sizes, boxes, max_distance)
+    return costs / sum(weights.values())
+
+
+def batched_cost_matrix(
+    predictions: np.ndarray,
+    sizes: np.ndarray,
+    boxes: np.ndarray,
+    num_tracks: np.ndarray,
+    num_detections: np.ndarray,
+    metric: str = "centroid",
+    weights: Optional[Dict[str, float]] = None,
+    max_distance: Optional[float] = None,
+) -> np.ndarray:
+    """Calculates the normalized cost matrices of independent problems padded to the same size in one batch.
+
+    Parameters
+    ----------
+    predictions : np.ndarray
+        Array of shape (K, T, 2) of the track predictions of each problem, padded after num_tracks.
+    sizes : np.ndarray
+        Array of shape (K, T, 2) of the (width, height) of the last bounding box matched to each track.
+    boxes : np.ndarray
+        Array of shape (K, D, 4) of the detected bounding boxes of each problem, padded after num_detections.
+    num_tracks : np.ndarray
+        Array of shape (K,) of the number of tracks of each problem.
+    num_detections : np.ndarray
+        Array of shape (K,) of the number of detections of each problem.
+    metric : str, optional
+        One of "centroid", "iou", "giou" or "mix", by default "centroid"
+    weights : Optional[Dict[str, float]], optional
+        Weight of each metric when metric is "mix", e.g. {"centroid": 0.5, "iou": 0.5}, by default None
+    max_distance : Optional[float], optional
+        Distance that normalizes the centroid metric to 1, by default the largest distance of each problem
+
+    Returns
+    -------
+    cost_matrices : np.ndarray
+        Array of shape (K, T, D) whose [k, :num_tracks[k], :num_detections[k]] block equals
+        cost_matrix of problem k. Padded entries are undefined.
+    """
+    predictions = np.asarray(predictions, dtype=np.float64)[:, :, None, :]
+    sizes = np.asarray(sizes, dtype=np.float64)[:, :, None, :]
+    boxes = np.asarray(boxes, dtype=np.float64)[:, None, :, :]
+    valid = (np.arange(predictions.shape[1]) < np.asarray(num_tracks)[:, None])[
+        :, :, None
+    ] & (np.arange(boxes.shape[2]) < np.asarray(num_detections)[:, None])[:, None, :]
+
+    def metric_costs(name: str) -> np.ndarray:
+        if name not in COST_METRICS:
+            raise ValueError(
+                f"Unknown metric '{name}', expected one of {list(COST_METRICS) + ['mix']}"
+            )
+        if name != "centroid" or max_distance is not None:
+            return COST_METRICS[name](predictions, sizes, boxes, max_distance)
+        # Normalize by the largest distance of each problem rather than of the batch
+        distances = COST_METRICS[name](predictions, sizes, boxes, 1.0)
+        scale = np.where(valid, distances, 0.0).max(axis=(1, 2), initial=0.0)
+        scale[scale == 0] = 1.0
+        distances /= scale[:, None, None]
+        return distances
+
+    if metric != "mix":
+        return metric_costs(metric)
+    if not weights:
+        raise ValueError("weights are required when metric is 'mix'")
+    costs = np.zeros(valid.shape)
+    for name, weight in weights.items():
+        costs += weight * metric_costs(name)
+    return costs / sum(weights.values())
@@ -0,0 +1,418 @@
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
+from object_tracking import MISSING_VALUE
+from object_tracking.algorithms.cost import _iou
+from object_tracking.algorithms.matching import get_matcher
+from object_tracking.utils.io.columnar import FrameDetections
+
+EPS = np.finfo(np.float64).eps
+
+# Localization thresholds HOTA is averaged over
+HOTA_ALPHAS = np.arange(0.05, 0.99, 0.05)
+
+# Added to the score of pairs matched in the previous frame, so CLEAR MOT keeps correspondences
+CONTINUITY_BONUS = 1000.0
+
+
+def frame_pairs(
+    tracked: FrameDetections,
+    ground_truth: FrameDetections,
+    chunk_entries: int = 1 << 20,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Finds the overlapping pairs of ground truth and tracked boxes of every frame.
+
+    Tracked boxes are sorted by frame and x_min, so the candidates of each ground truth box are
+    the range of boxes of its frame that can overlap it horizontally, found with a binary search.
+    The IoU of the candidates is computed in chunks of ground truth boxes.
+
+    Parameters
+    ----------
+    tracked : FrameDetections
+        Tracked bounding boxes of each frame.
+    ground_truth : FrameDetections
+        True bounding boxes of each frame, with the same number of frames.
+    chunk_entries : int, optional
+        Largest number of candidate pairs whose IoU is computed at once, by default 1 << 20
+
+    Returns
+    -------
+    frames : np.ndarray
+        Frame of each overlapping pair, in increasing order.
+    rows : np.ndarray
+        Row of the ground truth box of each pair.
+    cols : np.ndarray
+        Row of the tracked box of each pair.
+    ious : np.ndarray
+        Positive IoU of each pair.
+    """
+    truth_boxes = np.asarray(ground_truth.boxes, dtype=np.float64).reshape(-1, 4)
+    tracked_boxes = np.asarray(tracked.boxes, dtype=np.float64).reshape(-1, 4)
+    empty = np.zeros(0, dtype=np.int64)
+    if len(truth_boxes) == 0 or len(tracked_boxes) == 0:
+        return empty, empty, empty, np.zeros(0)
+    truth_frames = np.repeat(
+        np.arange(len(ground_truth)), np.diff(ground_truth.offsets)
+    )
+    tracked_frames = np.repeat(np.arange(len(tracked)), np.diff(tracked.offsets))
+
+    # Keys ordering boxes by frame, then x_min, with frames far enough apart not to interleave
+    widest = max(tracked_boxes[:, 2].max(), 0.0)
+    low = min(tracked_boxes[:, 0].min(), truth_boxes[:, 0].min())
+    high = max(
+        (tracked_boxes[:, 0] + tracked_boxes[:, 2]).max(),
+        (truth_boxes[:, 0] + truth_boxes[:, 2]).max(),
+    )
+    span = high - low + widest + 1.0
+    keys = tracked_frames * span + (tracked_boxes[:, 0] - low)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    truth_keys = truth_frames * span + (truth_boxes[:, 0] - low)
+    first = np.searchsorted(keys, truth_keys - widest, side="left")
+    last = np.searchsorted(keys, truth_keys + truth_boxes[:, 2], side="left")
+    counts = last - first
+    candidate_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    candidate_offsets[1:] = np.cumsum(counts)
+
+    parts: List[Tuple[np.ndarray, ...]] = []
+    start = 0
+    while start < len(counts):
+        end = max(
+            int(
+                np.searchsorted(
+                    candidate_offsets,
+                    candidate_offsets[start] + chunk_entries,
+                    side="right",
+                )
+            )
+            - 1,
+            start + 1,
+        )
+        chunk = np.arange(start, end)
+        rows = np.repeat(chunk, counts[chunk])
+        ranks = (
+            np.arange(len(rows)) + candidate_offsets[start] - candidate_offsets[rows]
+        )
+        cols = order[first[rows] + ranks]
+        ious = _iou(truth_boxes[rows], tracked_boxes[cols])
+        overlapping = ious > 0
+        parts.append(
+            (
+                truth_frames[rows[overlapping]],
+                rows[overlapping],
+                cols[overlapping],
+                ious[overlapping],
+            )
+        )
+        start = end
+    return tuple(np.concatenate(columns) for columns in zip(*parts))  # type: ignore
+
+
+def match_frames(
+    frames: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    scores: np.ndarray,
+    matcher: Callable,
+    keys: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Selects the pairs of a one-to-one matching of each frame with the largest total score.
+
+    Pairs whose row and column have no other pair are selected without solving, and only the
+    remaining pairs of each frame are assigned with the matcher. With keys, frames are solved in
+    order and pairs with the key of a pair selected in the previous frame get a CONTINUITY_BONUS.
+
+    Parameters
+    ----------
+    frames : np.ndarray
+        Frame of each candidate pair, in increasing order.
+    rows : np.ndarray
+        Row of each pair, distinct across frames.
+    cols : np.ndarray
+        Column of each pair, distinct across frames.
+    scores : np.ndarray
+        Positive score of each pair.
+    matcher : Callable
+        Assignment backend minimizing the cost of a dense matrix, see get_matcher.
+    keys : Optional[np.ndarray], optional
+        Identity of each pair across frames, e.g. its ground truth and track identifiers, by default None
+
+    Returns
+    -------
+    selected : np.ndarray
+        Boolean mask of the selected pairs.
+    """
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    selected = (np.bincount(rows)[rows] == 1) & (np.bincount(cols)[cols] == 1)
+    contested = np.nonzero(~selected)[0]
+    frame_starts = np.searchsorted(frames, np.arange(frames[-1] + 2))
+    contested_starts = np.searchsorted(frames[contested], np.arange(frames[-1] + 2))
+
+    for frame in np.unique(frames[contested]).tolist():
+        pairs = contested[contested_starts[frame] : contested_starts[frame + 1]]
+        frame_scores = scores[pairs]
+        if keys is not None and frame > 0:
+            previous = np.arange(frame_starts[frame - 1], frame_starts[frame])
+            previous_keys = keys[previous[selected[previous]]]
+            frame_scores = frame_scores + CONTINUITY_BONUS * np.isin(
+                keys[pairs], previous_keys
+            )
+        pair_rows, local_rows = np.unique(rows[pairs], return_inverse=True)
+        pair_cols, local_cols = np.unique(cols[pairs], return_inverse=True)
+        score_matrix = np.zeros((len(pair_rows), len(pair_cols)))
+        score_matrix[local_rows, local_cols] = frame_scores
+        index = np.full(score_matrix.shape, -1, dtype=np.int64)
+        index[local_rows, local_cols] = pairs
+        match_rows, match_cols = matcher(-score_matrix)
+        matched = index[match_rows, match_cols]
+        selected[matched[matched >= 0]] = True
+    return selected
+
+
+def _dense_ids(ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Numbers distinct identifiers 0..K-1, returning the number of boxes of each and the number of each box."""
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    return np.bincount(inverse, minlength=len(unique_ids)), inverse
+
+
+def _labelled(detections: FrameDetections) -> FrameDetections:
+    """Returns the detections with a track identifier, without those left MISSING_VALUE."""
+    ids = np.asarray(detections.ids)
+    labelled = ids != MISSING_VALUE
+    if labelled.all():
+        return detections
+    offsets = np.concatenate(([0], np.cumsum(labelled)))[detections.offsets]
+    return FrameDetections(
+        offsets, np.asarray(detections.boxes)[labelled], ids[labelled]
+    )
+
+
+def _clear_mot(
+    frames: np.ndarray,
+    truth_ids: np.ndarray,
+    track_ids: np.ndarray,
+    ious: np.ndarray,
+    truth_counts: np.ndarray,
+    num_tracked: int,
+) -> Dict[str, float]:
+    """CLEAR MOT metrics from the per-frame matches, given as arrays in increasing frame order."""
+    num_truths = int(truth_counts.sum())
+    tp = len(frames)
+
+    # Consecutive matches of the same ground truth object, in frame order
+    order = np.lexsort((frames, truth_ids))
+    truth_ids, track_ids, frames = truth_ids[order], track_ids[order], frames[order]
+    same_truth = truth_ids[1:] == truth_ids[:-1]
+    id_switches = int(np.count_nonzero(same_truth & (track_ids[1:] != track_ids[:-1])))
+    continued = same_truth & (frames[1:] == frames[:-1] + 1)
+    segments = tp - int(np.count_nonzero(continued))
+    fragmentations = segments - len(np.unique(truth_ids))
+
+    tracked_ratio = np.bincount(truth_ids, minlength=len(truth_counts)) / np.maximum(
+        truth_counts, 1
+    )
+    fp = num_tracked - tp
+    fn = num_truths - tp
+    return {
+        "MOTA": (tp - fp - id_switches) / max(num_truths, 1),
+        "MOTP": float(ious.sum()) / max(tp, 1),
+        "TP": tp,
+        "FP": fp,
+        "FN": fn,
+        "IDSW": id_switches,
+        "Frag": fragmentations,
+        "MT": int(np.count_nonzero(tracked_ratio > 0.8)),
+        "PT": int(np.count_nonzero((tracked_ratio >= 0.2) & (tracked_ratio <= 0.8))),
+        "ML": int(np.count_nonzero(tracked_ratio < 0.2)),
+    }
+
+
+def _identity(
+    truth_ids: np.ndarray,
+    track_ids: np.ndarray,
+    num_truths: int,
+    num_tracked: int,
+    matcher: Callable,
+) -> Dict[str, float]:
+    """Identity metrics from the ground truth and track identifiers of all pairs above the IoU threshold."""
+    if len(truth_ids) == 0:
+        id_tp = 0
+    else:
+        truth_index, truth_local = np.unique(truth_ids, return_inverse=True)
+        track_index, track_local = np.unique(track_ids, return_inverse=True)
+        # Frames each ground truth object and track could be matched in
+        overlaps = np.zeros((len(truth_index), len(track_index)))
+        np.add.at(overlaps, (truth_local, track_local), 1.0)
+        match_rows, match_cols = matcher(-overlaps)
+        id_tp = int(overlaps[match_rows, match_cols].sum())
+    return {
+        "IDF1": 2 * id_tp / max(num_truths + num_tracked, 1),
+        "IDP": id_tp / max(num_tracked, 1),
+        "IDR": id_tp / max(num_truths, 1),
+        "IDTP": id_tp,
+        "IDFP": num_tracked - id_tp,
+        "IDFN": num_truths - id_tp,
+    }
+
+
+def _hota(
+    frames: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    ious: np.ndarray,
+    truth_ids: np.ndarray,
+    track_ids: np.ndarray,
+    truth_counts: np.ndarray,
+    track_counts: np.ndarray,
+    matcher: Callable,
+) -> Dict[str, float]:
+    """HOTA metrics from all overlapping pairs, averaged over the HOTA_ALPHAS thresholds."""
+    num_truths = int(truth_counts.sum())
+    num_tracked = int(track_counts.sum())
+    num_tracks = len(track_counts)
+    keys = truth_ids * num_tracks + track_ids
+    unique_keys, key_index = np.unique(keys, return_inverse=True)
+    pair_truths, pair_tracks = unique_keys // num_tracks, unique_keys % num_tracks
+
+    # Global alignment of every ground truth object and track, from IoUs normalized per frame
+    denominator = (
+        np.bincount(rows, weights=ious, minlength=rows.max(initial=-1) + 1)[rows]
+        + np.bincount(cols, weights=ious, minlength=cols.max(initial=-1) + 1)[cols]
+        - ious
+    )
+    normalized = np.divide(
+        ious, denominator, out=np.zeros_like(ious), where=denominator > EPS
+    )
+    potential = np.bincount(key_index, weights=normalized, minlength=len(unique_keys))
+    alignment = potential / (
+        truth_counts[pair_truths] + track_counts[pair_tracks] - potential
+    )
+
+    selected = match_frames(frames, rows, cols, alignment[key_index] * ious, matcher)
+    matched_ious, matched_keys = ious[selected], key_index[selected]
+    # Matches of each threshold, of shape (A, K)
+    above = matched_ious[None, :] >= HOTA_ALPHAS[:, None] - EPS
+    tp = above.sum(axis=1)
+    pair_matches = np.zeros((len(HOTA_ALPHAS), len(unique_keys)))
+    for alpha in range(len(HOTA_ALPHAS)):
+        pair_matches[alpha] = np.bincount(
+            matched_keys[above[alpha]], minlength=len(unique_keys)
+        )
+    association = pair_matches / np.maximum(
+        1, truth_counts[pair_truths] + track_counts[pair_tracks] - pair_matches
+    )
+    ass_a = (pair_matches * association).sum(axis=1) / np.maximum(1, tp)
+    det_a = tp / np.maximum(1, num_truths + num_tracked - tp)
+    loc_a = (matched_ious[None, :] * above).sum(axis=1) / np.maximum(1, tp)
+    return {
+        "HOTA": float(np.sqrt(det_a * ass_a).mean()),
+        "DetA": float(det_a.mean()),
+        "AssA": float(ass_a.mean()),
+        "LocA": float(np.where(tp > 0, loc_a, 1.0).mean()),
+    }
+
+
+def evaluate(
+    tracked: Union[FrameDetections, Dict[str, List[Dict[str, int]]]],
+    ground_truth: Union[FrameDetections, Dict[str, List[Dict[str, int]]]],
+    iou_threshold: float = 0.5,
+    matcher: Union[str, Callable] = "scipy",
+    chunk_entries: int = 1 << 20,
+) -> Dict[str, float]:
+    """Scores tracked bounding boxes against the ground truth with the CLEAR MOT, identity and HOTA metrics.
+
+    The IoU of the pairs of boxes of the same frame that overlap horizontally is computed at once,
+    in chunks, and only frames where a box overlaps more than one box are assigned with the matcher.
+
+    - CLEAR MOT (MOTA, MOTP, IDSW, Frag, MT/PT/ML): each frame is matched maximizing the total IoU of
+      pairs above iou_threshold, keeping the pairs matched in the previous frame where possible.
+      An ID switch is a match of a ground truth object to another track than its last match.
+      As in TrackEval, frames without ground truth or without tracked boxes do not count as the
+      previous frame, so they neither end a match for continuity nor fragment a trajectory.
+    - Identity (IDF1, IDP, IDR): ground truth objects and tracks are matched one-to-one over the whole
+      sequence, maximizing the number of frames they overlap above iou_threshold.
+    - HOTA (HOTA, DetA, AssA, LocA): averaged over localization thresholds 0.05 to 0.95.
+
+    Tracked boxes without a track identifier (MISSING_VALUE), such as the detections of frames a
+    LatencyBudget coasted, are left out, so the objects they cover count as misses rather than as
+    one track.
+
+    Parameters
+    ----------
+    tracked : Union[FrameDetections, Dict[str, List[Dict[str, int]]]]
+        Tracked bounding boxes of each frame with their track identifiers, as columnar detections or a frame_dict.
+    ground_truth : Union[FrameDetections, Dict[str, List[Dict[str, int]]]]
+        True bounding boxes of each frame with their object identifiers, in the same format.
+    iou_threshold : float, optional
+        Smallest IoU of a match for the CLEAR MOT and identity metrics, by default 0.5
+    matcher : Union[str, Callable], optional
+        Assignment backend, see get_matcher, by default "scipy"
+    chunk_entries : int, optional
+        Largest number of candidate box pairs whose IoU is computed at once, by default 1 << 20
+
+    Returns
+    -------
+    metrics : Dict[str, float]
+        Value of each metric, with the counts as integers.
+    """
+    if not isinstance(tracked, FrameDetections):
+        tracked = FrameDetections.from_frame_dict(tracked)
+    if not isinstance(ground_truth, FrameDetections):
+        ground_truth = FrameDetections.from_frame_dict(ground_truth)
+    if len(tracked) != len(ground_truth):
+        raise ValueError(
+            f"Tracked detections have {len(tracked)} frames, ground truth has {len(ground_truth)}"
+        )
+    matcher = get_matcher(matcher)
+    tracked = _labelled(tracked)
+
+    truth_counts, truth_ids = _dense_ids(np.asarray(ground_truth.ids))
+    track_counts, track_ids = _dense_ids(np.asarray(tracked.ids))
+    num_truths, num_tracked = len(truth_ids), len(track_ids)
+    frames, rows, cols, ious = frame_pairs(tracked, ground_truth, chunk_entries)
+
+    above = ious >= iou_threshold - EPS
+    frames_above, rows_above, cols_above, ious_above = (
+        frames[above],
+        rows[above],
+        cols[above],
+        ious[above],
+    )
+    pair_truths, pair_tracks = truth_ids[rows_above], track_ids[cols_above]
+    # As in TrackEval, frames without ground truth or without tracked boxes are skipped rather than
+    # ending the matches, so they are numbered by the frames that have both
+    both = (np.diff(ground_truth.offsets) > 0) & (np.diff(tracked.offsets) > 0)
+    steps_above = (np.cumsum(both) - 1)[frames_above]
+    selected = match_frames(
+        steps_above,
+        rows_above,
+        cols_above,
+        ious_above,
+        matcher,
+        keys=pair_truths * len(track_counts) + pair_tracks,
+    )
+
+    return {
+        **_clear_mot(
+            steps_above[selected],
+            pair_truths[selected],
+            pair_tracks[selected],
+            ious_above[selected],
+            truth_counts,
+            num_tracked,
+        ),
+        **_identity(pair_truths, pair_tracks, num_truths, num_tracked, matcher),
+        **_hota(
+            frames,
+            rows,
+            cols,
+            ious,
+            truth_ids[rows],
+            track_ids[cols],
+            truth_counts,
+            track_counts,
+            matcher,
+        ),
+        "num_truths": num_truths,
+        "num_tracked": num_tracked,
+    }
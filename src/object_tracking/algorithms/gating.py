@@ -0,0 +1,81 @@
+from typing import List, Tuple
+import numpy as np
+from object_tracking.algorithms.cost import box_centroids
+
+
+def gate_pairs(
+    points: np.ndarray, boxes: np.ndarray, gate_distance: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Finds the candidate pairs of points and boxes whose centroids are within the gate distance.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        Array of shape (T, 2) of (x, y) coordinates, e.g. track predictions.
+    boxes : np.ndarray
+        Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height).
+    gate_distance : float
+        Maximum distance (pixels) between a point and a box centroid for the pair to be a candidate.
+
+    Returns
+    -------
+    rows : np.ndarray
+        Indices of the points of each candidate pair.
+    cols : np.ndarray
+        Indices of the boxes of each candidate pair.
+    """
+    if len(points) == 0 or len(boxes) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    # SciPy is only loaded once gating is used
+    from scipy.spatial import cKDTree
+
+    pairs = cKDTree(np.asarray(points, dtype=np.float64)).sparse_distance_matrix(
+        cKDTree(box_centroids(boxes)), gate_distance, output_type="ndarray"
+    )
+    return pairs["i"].astype(int), pairs["j"].astype(int)
+
+
+def split_components(
+    rows: np.ndarray, cols: np.ndarray, num_rows: int, num_cols: int
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Splits a sparse bipartite graph of candidate pairs into independent assignment problems.
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        Row indices of the candidate pairs.
+    cols : np.ndarray
+        Column indices of the candidate pairs.
+    num_rows : int
+        Number of rows, e.g. tracks.
+    num_cols : int
+        Number of columns, e.g. detections.
+
+    Returns
+    -------
+    isolated : np.ndarray
+        Boolean mask of the candidate pairs whose row and column have no other candidate, which need no solving.
+    components : List[np.ndarray]
+        Indices of the candidate pairs of every other connected component.
+    """
+    if len(rows) == 0:
+        return np.zeros(0, dtype=bool), []
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    num_nodes = num_rows + num_cols
+    adjacency = coo_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, cols + num_rows)),
+        shape=(num_nodes, num_nodes),
+    )
+    _, labels = connected_components(adjacency, directed=False)
+
+    # Label each pair by the component of its row
+    pair_labels = labels[rows]
+    isolated = np.bincount(pair_labels)[pair_labels] == 1
+
+    pairs = np.nonzero(~isolated)[0]
+    pairs = pairs[np.argsort(pair_labels[pairs], kind="stable")]
+    splits = np.nonzero(np.diff(pair_labels[pairs]))[0] + 1
+    components = np.split(pairs, splits) if len(pairs) else []
+    return isolated, components
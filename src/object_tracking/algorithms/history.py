@@ -0,0 +1,327 @@
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+
+# One observation of a track in the record log, the track identifier is kept by its segment
+RECORD_DTYPE = np.dtype(
+    [
+        ("frame", "<i4"),
+        ("x_min", "<f4"),
+        ("y_min", "<f4"),
+        ("width", "<f4"),
+        ("height", "<f4"),
+    ]
+)
+
+# A run of consecutive records of one track in the record log
+SEGMENT_DTYPE = np.dtype(
+    [
+        ("id", "<i8"),
+        ("first_frame", "<i4"),
+        ("last_frame", "<i4"),
+        ("offset", "<i8"),
+        ("count", "<i4"),
+    ]
+)
+
+
+class TrackHistory:
+    def __init__(self, save_path: str, buffer_size: int = 256, capacity: int = 16):
+        """Archives the trajectory of every track with bounded memory.
+
+        The latest observations of each live track are kept in a fixed-size buffer. A full buffer,
+        and the rest of a track once it is finished, is appended to records.bin in the save_path
+        directory as one segment, and the segment is appended to the index in segments.bin. Only the
+        index is kept in memory, so trajectories are read back with one read per segment and the
+        tracks alive in a range of frames are found from the lifespan of each track. Reopening a
+        directory continues its log after its last frame, discarding what an interrupted write left
+        after the last complete segment.
+
+        Parameters
+        ----------
+        save_path : str
+            Directory of the record log and its index.
+        buffer_size : int, optional
+            Number of observations of a live track kept in memory before they are written, by default 256
+        capacity : int, optional
+            Initial number of live tracks the buffers can hold before growing, by default 16
+        """
+        self.path = Path(save_path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.buffer_size = buffer_size
+
+        # Buffers of the live tracks, sorted by identifier
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._first_frames = np.zeros(capacity, dtype=np.int64)
+        self._last_frames = np.zeros(capacity, dtype=np.int64)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+        self._buffers = np.zeros((capacity, buffer_size), dtype=RECORD_DTYPE)
+        self._size = 0
+
+        records_path = self.path / "records.bin"
+        segments_path = self.path / "segments.bin"
+        num_records = (
+            records_path.stat().st_size // RECORD_DTYPE.itemsize
+            if records_path.exists()
+            else 0
+        )
+        segments = (
+            np.fromfile(
+                segments_path,
+                dtype=SEGMENT_DTYPE,
+                count=segments_path.stat().st_size // SEGMENT_DTYPE.itemsize,
+            )
+            if segments_path.exists()
+            else np.zeros(0, dtype=SEGMENT_DTYPE)
+        )
+        # Records are written before their segment, so an interrupted write leaves a torn or
+        # missing last segment and records without one. Both logs are cut after the last complete
+        # segment, so that new records and segments are appended where the index expects them.
+        written = segments["offset"] + segments["count"] <= num_records
+        num_segments = int(np.argmin(written)) if not written.all() else len(segments)
+        self._segments = segments[:num_segments]
+        num_records = (
+            int(self._segments["offset"][-1] + self._segments["count"][-1])
+            if num_segments
+            else 0
+        )
+        for log_path, size in (
+            (records_path, num_records * RECORD_DTYPE.itemsize),
+            (segments_path, num_segments * SEGMENT_DTYPE.itemsize),
+        ):
+            if log_path.exists() and log_path.stat().st_size > size:
+                os.truncate(log_path, size)
+        self._num_segments = len(self._segments)
+        self._num_records = num_records
+        # Frames continue after the last one in the log
+        self.frame = (
+            int(self.segments["last_frame"].max()) + 1 if len(self.segments) else 0
+        )
+        self._records = open(records_path, "ab")
+        self._segment_log = open(segments_path, "ab")
+
+        # Segments of each track, and the lifespan of the tracks that are not live
+        self._track_segments: Dict[int, List[int]] = {}
+        for index, track_id in enumerate(self.segments["id"].tolist()):
+            self._track_segments.setdefault(track_id, []).append(index)
+        track_ids, inverse = np.unique(self.segments["id"], return_inverse=True)
+        self._spans = np.zeros((len(track_ids), 2), dtype=np.int64)
+        self._spans[:, 0] = np.iinfo(np.int64).max
+        np.minimum.at(self._spans[:, 0], inverse, self.segments["first_frame"])
+        np.maximum.at(self._spans[:, 1], inverse, self.segments["last_frame"])
+        self._span_ids = track_ids.astype(np.int64)
+        self._num_spans = len(track_ids)
+
+    def __len__(self) -> int:
+        """Number of live tracks."""
+        return self._size
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Array of shape (N,) of the sorted identifiers of the live tracks."""
+        return self._ids[: self._size]
+
+    @property
+    def segments(self) -> np.ndarray:
+        """Structured array of SEGMENT_DTYPE of the segments in the log, in the order they were written."""
+        return self._segments[: self._num_segments]
+
+    @staticmethod
+    def _append(array: np.ndarray, size: int, values: np.ndarray) -> np.ndarray:
+        """Writes values after the first size rows of array, returning it or a copy of twice the capacity."""
+        if size + len(values) > len(array):
+            grown = np.zeros(
+                (max(2 * len(array), size + len(values)),) + array.shape[1:],
+                dtype=array.dtype,
+            )
+            grown[:size] = array[:size]
+            array = grown
+        array[size : size + len(values)] = values
+        return array
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_ids", "_first_frames", "_last_frames", "_counts", "_buffers"):
+            old = getattr(self, name)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[: self._size] = old[: self._size]
+            setattr(self, name, grown)
+
+    def _start(self, ids: np.ndarray) -> None:
+        """Starts the buffers of new live tracks, keeping them sorted by identifier."""
+        ids = np.unique(ids)
+        n = self._size
+        self._reserve(n + len(ids))
+        merged = np.concatenate([self._ids[:n], ids])
+        order = np.argsort(merged, kind="stable")
+        for name in ("_ids", "_first_frames", "_last_frames", "_counts", "_buffers"):
+            array = getattr(self, name)
+            array[n : n + len(ids)] = ids if name == "_ids" else 0
+            array[: n + len(ids)] = array[: n + len(ids)][order]
+        started = np.searchsorted(self._ids[: n + len(ids)], ids)
+        self._first_frames[started] = self.frame
+        self._size = n + len(ids)
+
+    def _spill(self, slots: np.ndarray) -> None:
+        """Appends the buffered observations of the selected live tracks to the log as one segment each."""
+        slots = slots[self._counts[slots] > 0]
+        if len(slots) == 0:
+            return
+        counts = self._counts[slots]
+        valid = np.arange(self.buffer_size) < counts[:, None]
+        records = self._buffers[slots][valid]
+
+        segments = np.zeros(len(slots), dtype=SEGMENT_DTYPE)
+        segments["id"] = self._ids[slots]
+        segments["first_frame"] = self._buffers[slots, 0]["frame"]
+        segments["last_frame"] = self._buffers[slots, counts - 1]["frame"]
+        segments["offset"] = self._num_records + np.cumsum(counts) - counts
+        segments["count"] = counts
+
+        # Records are written before the segments that point to them
+        self._records.write(records.tobytes())
+        self._records.flush()
+        self._segment_log.write(segments.tobytes())
+        self._segment_log.flush()
+
+        for index, track_id in enumerate(segments["id"].tolist(), self._num_segments):
+            self._track_segments.setdefault(track_id, []).append(index)
+        self._segments = self._append(self._segments, self._num_segments, segments)
+        self._num_segments += len(segments)
+        self._num_records += len(records)
+        self._counts[slots] = 0
+
+    def record(self, ids: np.ndarray, boxes: np.ndarray) -> None:
+        """Appends the bounding box of each track observed in the next frame.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Array of shape (K,) of distinct track identifiers, new identifiers start live tracks.
+        boxes : np.ndarray
+            Array of shape (K, 4) of bounding boxes as (x_min, y_min, width, height).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        slots = np.searchsorted(self.ids, ids)
+        known = slots < self._size
+        known[known] = self._ids[slots[known]] == ids[known]
+        if not known.all():
+            self._start(ids[~known])
+            slots = np.searchsorted(self.ids, ids)
+
+        buffered = self._buffers[slots, self._counts[slots]]
+        buffered["frame"] = self.frame
+        for column, name in enumerate(RECORD_DTYPE.names[1:]):
+            buffered[name] = boxes[:, column]
+        self._buffers[slots, self._counts[slots]] = buffered
+        self._counts[slots] += 1
+        self._last_frames[slots] = self.frame
+        self._spill(slots[self._counts[slots] == self.buffer_size])
+        self.frame += 1
+
+    def finish(self, ids: np.ndarray) -> None:
+        """Writes out the remaining observations of finished tracks and releases their buffers.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Identifiers of the finished tracks, identifiers that are not live are ignored.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        slots = np.searchsorted(self.ids, ids)
+        slots = slots[slots < self._size]
+        slots = np.unique(slots[np.isin(self._ids[slots], ids)])
+        if len(slots) == 0:
+            return
+        self._spill(slots)
+
+        spans = np.stack([self._first_frames[slots], self._last_frames[slots]], axis=1)
+        self._span_ids = self._append(self._span_ids, self._num_spans, self._ids[slots])
+        self._spans = self._append(self._spans, self._num_spans, spans)
+        self._num_spans += len(slots)
+
+        keep = np.ones(self._size, dtype=bool)
+        keep[slots] = False
+        k = int(np.count_nonzero(keep))
+        for name in ("_ids", "_first_frames", "_last_frames", "_counts", "_buffers"):
+            array = getattr(self, name)
+            array[:k] = array[: self._size][keep]
+        self._size = k
+
+    def trajectory(self, track_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the observations of a track in the order they were recorded.
+
+        Parameters
+        ----------
+        track_id : int
+            Identifier of the track.
+
+        Returns
+        -------
+        frames : np.ndarray
+            Array of shape (K,) of the frames the track was observed in, empty for unknown tracks.
+        boxes : np.ndarray
+            Array of shape (K, 4) of the bounding box of the track in each frame.
+        """
+        self._records.flush()
+        parts = [
+            np.fromfile(
+                self._records.name,
+                dtype=RECORD_DTYPE,
+                count=int(self._segments["count"][index]),
+                offset=int(self._segments["offset"][index]) * RECORD_DTYPE.itemsize,
+            )
+            for index in self._track_segments.get(int(track_id), [])
+        ]
+        slot = int(np.searchsorted(self.ids, track_id))
+        if slot < self._size and self._ids[slot] == track_id:
+            parts.append(self._buffers[slot, : self._counts[slot]])
+        records = np.concatenate(parts) if parts else np.zeros(0, dtype=RECORD_DTYPE)
+        boxes = np.stack(
+            [records[name] for name in RECORD_DTYPE.names[1:]], axis=1
+        ).astype(np.float64)
+        return records["frame"].astype(np.int64), boxes.reshape(-1, 4)
+
+    def alive(self, first_frame: int, last_frame: int) -> np.ndarray:
+        """Returns the tracks alive in any of the frames first_frame to last_frame (inclusive).
+
+        A track is alive from the first to the last frame it was observed in.
+
+        Parameters
+        ----------
+        first_frame : int
+            First frame of the range.
+        last_frame : int
+            Last frame of the range.
+
+        Returns
+        -------
+        ids : np.ndarray
+            Sorted identifiers of the tracks alive in the range.
+        """
+        spans = self._spans[: self._num_spans]
+        finished = (spans[:, 0] <= last_frame) & (spans[:, 1] >= first_frame)
+        live = (self._first_frames[: self._size] <= last_frame) & (
+            self._last_frames[: self._size] >= first_frame
+        )
+        return np.union1d(self._span_ids[: self._num_spans][finished], self.ids[live])
+
+    def close(self) -> None:
+        """Writes out the observations of the live tracks and closes the log.
+
+        Live tracks are finished, so reopening the directory continues them as new segments of the same identifiers.
+        """
+        self.finish(self.ids.copy())
+        self._records.close()
+        self._segment_log.close()
+
+    def __enter__(self) -> "TrackHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,52 +1,78 @@
-from typing import Tuple
+from typing import Callable, Dict, Optional, Tuple, Union
 import numpy as np
 
 
 class HungarianMatcher:
     @staticmethod
-    def pad_matrix(A: np.ndarray) -> np.ndarray:
-        n, m = A.shape
-        max_value = np.max(A) * 10
-        if n > m:
-            # More rows than columns, add columns
-            padding = np.full((n, n - m), max_value)
-            A_padded = np.hstack((A, padding))
-        elif n < m:
-            # More columns than rows, add rows
-            padding = np.full((m - n, m), max_value)
-            A_padded = np.vstack((A, padding))
-        else:
-            # The matrix is already square, no padding needed
-            A_padded = A
-        return A_padded
+    def _empty() -> Tuple[np.ndarray, np.ndarray]:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
 
-    def __call__(self, A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        original_n, original_m = A.shape
-        A_padded = HungarianMatcher.pad_matrix(A)
-        n, m = A_padded.shape
-        u, v = np.zeros(n + 1), np.zeros(m + 1)
-        p, way = np.zeros(m + 1, dtype=int), np.zeros(m + 1, dtype=int)
+    @staticmethod
+    def _solve(
+        A: np.ndarray,
+        slack: int = 0,
+        slack_cost: float = 0.0,
+        u: Optional[np.ndarray] = None,
+        v: Optional[np.ndarray] = None,
+        p: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Solves the assignment problem row by row with shortest augmenting paths.
+
+        Parameters
+        ----------
+        A : np.ndarray
+            Cost matrix of shape (n, m) with n <= m + slack.
+        slack : int, optional
+            Number of implicit columns appended to A that cost slack_cost for every row, by default 0
+        slack_cost : float, optional
+            Cost of assigning a row to a slack column, by default 0.0
+        u : Optional[np.ndarray], optional
+            Array of shape (n + 1,) of (one-based) row potentials, updated in place, by default zeros
+        v : Optional[np.ndarray], optional
+            Array of shape (m + slack + 1,) of (one-based) column potentials with u[i] + v[j] <= A[i - 1, j - 1],
+            updated in place, by default zeros
+        p : Optional[np.ndarray], optional
+            Initial partial matching in the format of the result, using only edges with u[i] + v[j] == A[i - 1, j - 1].
+            Only the rows it leaves unassigned are solved, by default empty
+
+        Returns
+        -------
+        p : np.ndarray
+            Array of shape (m + slack + 1,) where p[j] is the (one-based) row assigned to the (one-based) column j, 0 if unassigned.
+        """
+        n, m = A.shape
+        m += slack
+        u = np.zeros(n + 1) if u is None else u
+        v = np.zeros(m + 1) if v is None else v
+        p = np.zeros(m + 1, dtype=int) if p is None else p
+        way = np.zeros(m + 1, dtype=int)
+        row = np.full(m, slack_cost)
+        assigned = np.zeros(n + 1, dtype=bool)
+        assigned[p[1:]] = True
         for i in range(1, n + 1):
+            if assigned[i]:
+                continue
             p[0] = i
             minv = np.full(m + 1, np.inf)
             used = np.zeros(m + 1, dtype=bool)
             j0 = 0
             while True:
                 used[j0] = True
-                i0, delta = p[j0], np.inf
-                for j in range(1, m + 1):
-                    if not used[j]:
-                        cur = A_padded[i0 - 1, j - 1] - u[i0] - v[j]
-                        if cur < minv[j]:
-                            minv[j], way[j] = cur, j0
-                        if minv[j] < delta:
-                            delta, j1 = minv[j], j
-                for j in range(m + 1):
-                    if used[j]:
-                        u[p[j]] += delta
-                        v[j] -= delta
-                    else:
-                        minv[j] -= delta
+                i0 = p[j0]
+                free = ~used
+                # Relax the reduced costs of every free column in one step
+                row[: m - slack] = A[i0 - 1]
+                cur = row - u[i0] - v[1:]
+                relax = free[1:] & (cur < minv[1:])
+                minv[1:][relax] = cur[relax]
+                way[1:][relax] = j0
+                # Pick the first free column with the smallest reduced cost
+                candidates = np.where(free, minv, np.inf)
+                j1 = int(np.argmin(candidates))
+                delta = candidates[j1]
+                u[p[used]] += delta
+                v[used] -= delta
+                minv[free] -= delta
                 j0 = j1
                 if p[j0] == 0:
                     break
@@ -54,17 +80,431 @@ class HungarianMatcher:
                 j1 = way[j0]
                 p[j0] = p[j1]
                 j0 = j1
+        return p
+
+    def __call__(self, A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the linear sum assignment problem for a (possibly rectangular) cost matrix.
 
-        # Adjust for zero-based indexing and filter out padding
-        ans = (
-            np.zeros(original_n, dtype=int) - 1
-        )  # Initialize with -1 to indicate no assignment
-        for j in range(1, min(original_m + 1, m + 1)):
-            if p[j] - 1 < original_n:
-                ans[p[j] - 1] = j - 1
+        Parameters
+        ----------
+        A : np.ndarray
+            Cost matrix of shape (n, m).
 
-        # Find the rows that have been assigned
-        row_ind = np.where(ans >= 0)[0]
-        col_ind = ans[row_ind]
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        A = np.asarray(A, dtype=np.float64)
+        n, m = A.shape
+
+        # Fast paths for degenerate problems
+        if n == 0 or m == 0:
+            return HungarianMatcher._empty()
+        if n == 1:
+            return np.zeros(1, dtype=int), np.array([np.argmin(A[0])])
+
+        # The solver assigns every row, so surplus rows are absorbed by implicit
+        # constant-cost slack columns instead of a padded copy of the matrix
+        slack = max(n - m, 0)
+        p = HungarianMatcher._solve(
+            np.ascontiguousarray(A), slack=slack, slack_cost=np.max(A) * 10
+        )
+
+        return HungarianMatcher._assignment(p, m)
+
+    @staticmethod
+    def _assignment(p: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Adjust for zero-based indexing and drop unassigned and slack columns
+        cols = np.nonzero(p[1 : m + 1])[0]
+        rows = p[1 : m + 1][cols] - 1
+
+        order = np.argsort(rows)
+        row_ind = rows[order]
+        col_ind = cols[order]
 
         return row_ind, col_ind
+
+
+class IncrementalHungarianMatcher(HungarianMatcher):
+    def __call__(self, A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the linear sum assignment problem by repairing the greedy matching of a reduced matrix.
+
+        Rows and columns are reduced so that every row is tight with its cheapest column, each
+        column is matched to the first row that is tight with it, and only the rows left over
+        are solved by shortest augmenting paths. Between two frames most tracks keep their own
+        nearest detection, so only births and tracks that compete for a detection cost a phase.
+        The assignment is optimal, but ties may be broken differently than by HungarianMatcher.
+
+        Parameters
+        ----------
+        A : np.ndarray
+            Cost matrix of shape (n, m).
+
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        A = np.ascontiguousarray(A, dtype=np.float64)
+        n, m = A.shape
+        if n == 0 or m == 0:
+            return HungarianMatcher._empty()
+
+        slack = max(n - m, 0)
+        slack_cost = np.max(A) * 10
+
+        # Row reduction makes every row tight with its cheapest column
+        u = np.zeros(n + 1)
+        u[1:] = A.min(axis=1)
+        reduced = A - u[1:, None]
+        v = np.zeros(m + slack + 1)
+        p = np.zeros(m + slack + 1, dtype=int)
+        if n < m:
+            # Columns left free must keep the largest potential, so v stays zero and
+            # each column is seeded with the first row whose cheapest column it is
+            cols, first_rows = np.unique(np.argmin(reduced, axis=1), return_index=True)
+            p[cols + 1] = first_rows + 1
+        else:
+            # Every column ends up assigned, so a column reduction keeps u[i] + v[j] <= A[i, j]
+            tight_rows = np.argmin(reduced, axis=0)
+            v[1 : m + 1] = reduced[tight_rows, np.arange(m)]
+            v[m + 1 :] = slack_cost - u[1:].max()
+            rows, first_cols = np.unique(tight_rows, return_index=True)
+            p[first_cols + 1] = rows + 1
+
+        p = HungarianMatcher._solve(A, slack, slack_cost, u, v, p)
+        return HungarianMatcher._assignment(p, m)
+
+
+class ScipyMatcher:
+    def __call__(self, A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the linear sum assignment problem with scipy.optimize.linear_sum_assignment.
+
+        Parameters
+        ----------
+        A : np.ndarray
+            Cost matrix of shape (n, m).
+
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        A = np.asarray(A, dtype=np.float64)
+        if A.size == 0:
+            return HungarianMatcher._empty()
+        # SciPy is loaded by the backends that use it, the default backends only need NumPy
+        from scipy.optimize import linear_sum_assignment
+
+        return linear_sum_assignment(A)
+
+
+class SparseJVMatcher:
+    def __call__(self, A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the linear sum assignment problem with the sparse Jonker-Volgenant solver of scipy.
+
+        Parameters
+        ----------
+        A : np.ndarray
+            Cost matrix of shape (n, m).
+
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        A = np.asarray(A, dtype=np.float64)
+        n, m = A.shape
+        if n == 0 or m == 0:
+            return HungarianMatcher._empty()
+        if n > m:
+            col_ind, row_ind = self(A.T)
+            order = np.argsort(row_ind)
+            return row_ind[order], col_ind[order]
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+        # Zero weights are not edges, so costs are shifted to be at least 1
+        return min_weight_full_bipartite_matching(csr_matrix(A - A.min() + 1.0))
+
+    def solve_sparse(
+        self, rows: np.ndarray, cols: np.ndarray, costs: np.ndarray, num_cols: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Matches rows with columns using only the given candidate pairs.
+
+        As many rows as possible are matched, and among those matchings the total cost is minimal.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            Row index of each candidate pair.
+        cols : np.ndarray
+            Column index of each candidate pair.
+        costs : np.ndarray
+            Cost of each candidate pair.
+        num_cols : int
+            Number of columns.
+
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        if len(rows) == 0:
+            return HungarianMatcher._empty()
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+        num_rows = int(rows.max()) + 1
+        weights = np.asarray(costs, dtype=np.float64)
+        # Zero weights are not edges, so costs are shifted to be at least 1
+        weights = weights - weights.min() + 1.0
+        # Every row gets its own dummy column so that a full matching always exists,
+        # costing more than any matching of the candidate pairs so few rows use it
+        dummy_cost = num_rows * weights.max() + 1.0
+        graph = csr_matrix(
+            (
+                np.concatenate([weights, np.full(num_rows, dummy_cost)]),
+                (
+                    np.concatenate([rows, np.arange(num_rows)]),
+                    np.concatenate([cols, num_cols + np.arange(num_rows)]),
+                ),
+            ),
+            shape=(num_rows, num_cols + num_rows),
+        )
+        row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+        matched = col_ind < num_cols
+        return row_ind[matched], col_ind[matched]
+
+
+class GreedyMatcher:
+    def __call__(self, A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Matches rows with columns nearest first, i.e. the cheapest remaining pair is matched next.
+
+        The pairs that are the cheapest of both their row and their column are matched together
+        each round, which gives the nearest-first matching without sorting every pair. The
+        assignment is not optimal, but in practice close to it when objects are well separated.
+
+        Parameters
+        ----------
+        A : np.ndarray
+            Cost matrix of shape (n, m).
+
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        A = np.asarray(A, dtype=np.float64)
+        rows, cols = np.arange(A.shape[0]), np.arange(A.shape[1])
+        row_ind, col_ind = [], []
+        while len(rows) and len(cols):
+            sub = A[np.ix_(rows, cols)]
+            best_cols = np.argmin(sub, axis=1)
+            best_rows = np.argmin(sub, axis=0)
+            mutual = best_rows[best_cols] == np.arange(len(rows))
+            row_ind.append(rows[mutual])
+            col_ind.append(cols[best_cols[mutual]])
+            cols = np.delete(cols, best_cols[mutual])
+            rows = rows[~mutual]
+
+        if not row_ind:
+            return HungarianMatcher._empty()
+        row_ind, col_ind = np.concatenate(row_ind), np.concatenate(col_ind)
+        order = np.argsort(row_ind)
+        return row_ind[order], col_ind[order]
+
+    def solve_sparse(
+        self, rows: np.ndarray, cols: np.ndarray, costs: np.ndarray, num_cols: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Matches rows with columns nearest first using only the given candidate pairs.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            Row index of each candidate pair.
+        cols : np.ndarray
+            Column index of each candidate pair.
+        costs : np.ndarray
+            Cost of each candidate pair.
+        num_cols : int
+            Number of columns.
+
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        costs = np.asarray(costs, dtype=np.float64)
+        # Ties are broken by the order of the pairs, so the cheapest pair is always mutual
+        pairs = np.arange(len(rows))
+        row_ind, col_ind = [], []
+        while len(pairs):
+            by_row = np.lexsort((pairs, costs, rows))
+            first = np.ones(len(by_row), dtype=bool)
+            first[1:] = rows[by_row[1:]] != rows[by_row[:-1]]
+            by_col = np.lexsort((pairs, costs, cols))
+            col_first = np.ones(len(by_col), dtype=bool)
+            col_first[1:] = cols[by_col[1:]] != cols[by_col[:-1]]
+            mutual = np.intersect1d(
+                by_row[first], by_col[col_first], assume_unique=True
+            )
+            row_ind.append(rows[mutual])
+            col_ind.append(cols[mutual])
+            left = ~np.isin(rows, rows[mutual]) & ~np.isin(cols, cols[mutual])
+            rows, cols, costs, pairs = rows[left], cols[left], costs[left], pairs[left]
+
+        if not row_ind:
+            return HungarianMatcher._empty()
+        row_ind, col_ind = np.concatenate(row_ind), np.concatenate(col_ind)
+        order = np.argsort(row_ind)
+        return row_ind[order], col_ind[order]
+
+
+class AuctionMatcher:
+    def __init__(self, epsilon: float = 1e-4, scaling: Optional[float] = 4.0) -> None:
+        """Initializes the auction matcher.
+
+        Parameters
+        ----------
+        epsilon : float, optional
+            Minimum bid increment. The total cost is within max(n, m) * epsilon of the optimum, by default 1e-4
+        scaling : Optional[float], optional
+            If set, bidding starts with the range of the costs as the bid increment and repeats with the increment
+            divided by scaling until it reaches epsilon, which bounds the number of bids when many rows want the
+            same columns or the costs span a large range, as with the padding of gated components. With None,
+            every bid uses epsilon, by default 4.0
+        """
+        self.epsilon = epsilon
+        self.scaling = scaling
+
+    def __call__(self, A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the linear sum assignment problem approximately with an epsilon-scaled auction.
+
+        Every unassigned row bids for its best column at once, raising the price of the column by the
+        difference between its best and second best value plus the bid increment, and the highest bid
+        wins each column.
+
+        Parameters
+        ----------
+        A : np.ndarray
+            Cost matrix of shape (n, m).
+
+        Returns
+        -------
+        row_ind : np.ndarray
+            Sorted indices of the assigned rows.
+        col_ind : np.ndarray
+            Indices of the columns assigned to each row in row_ind.
+        """
+        A = np.asarray(A, dtype=np.float64)
+        n, m = A.shape
+        if n == 0 or m == 0:
+            return HungarianMatcher._empty()
+        if n == 1 or m == 1:
+            return HungarianMatcher()(A)
+        if n > m:
+            col_ind, row_ind = self(A.T)
+            order = np.argsort(row_ind)
+            return row_ind[order], col_ind[order]
+
+        # Dummy rows of zero cost make the problem square. They value every column the
+        # same, so instead of bidding against each other they take the cheapest columns
+        prices = np.zeros(m)
+        owners = np.full(m, -1)
+        assignment = np.full(m, -1)
+        epsilon = self.epsilon if self.scaling is None else max(np.ptp(A), self.epsilon)
+        while True:
+            if self.scaling is not None:
+                epsilon = max(epsilon / self.scaling, self.epsilon)
+            # Each round keeps the prices and the assignments that are still within
+            # the smaller bid increment of the best value, the other rows bid again
+            rows = np.nonzero(assignment[:n] >= 0)[0]
+            cols = assignment[rows]
+            stale_rows = (
+                -A[rows, cols] - prices[cols]
+                < np.max(-A[rows] - prices, axis=1) - epsilon
+            )
+            dummies = n + np.nonzero(assignment[n:] >= 0)[0]
+            stale_dummies = prices[assignment[dummies]] > prices.min() + epsilon
+            released = np.concatenate([rows[stale_rows], dummies[stale_dummies]])
+            owners[assignment[released]] = -1
+            assignment[released] = -1
+            while True:
+                unassigned = assignment < 0
+                bidders = np.nonzero(unassigned[:n])[0]
+                values = -A[bidders] - prices
+                best = np.argmax(values, axis=1)
+                best_values = values[np.arange(len(bidders)), best]
+                values[np.arange(len(bidders)), best] = -np.inf
+                bids = prices[best] + best_values - values.max(axis=1) + epsilon
+
+                dummies = n + np.nonzero(unassigned[n:])[0]
+                if len(dummies):
+                    cheapest = np.argpartition(prices, len(dummies))
+                    bidders = np.concatenate([bidders, dummies])
+                    best = np.concatenate([best, cheapest[: len(dummies)]])
+                    dummy_bid = prices[cheapest[len(dummies)]] + epsilon
+                    bids = np.concatenate([bids, np.full(len(dummies), dummy_bid)])
+                if len(bidders) == 0:
+                    break
+
+                # The highest bid for each column wins it
+                order = np.lexsort((-bids, best))
+                columns, first = np.unique(best[order], return_index=True)
+                winners = bidders[order[first]]
+                outbid = owners[columns]
+                assignment[outbid[outbid >= 0]] = -1
+                owners[columns] = winners
+                assignment[winners] = columns
+                prices[columns] = bids[order[first]]
+            if epsilon <= self.epsilon:
+                break
+
+        return np.arange(n), assignment[:n]
+
+
+# Assignment backends of BoundingBoxMatcher by name
+MATCHERS: Dict[str, Callable[[], Callable]] = {
+    "hungarian": HungarianMatcher,
+    "incremental": IncrementalHungarianMatcher,
+    "scipy": ScipyMatcher,
+    "sparse_jv": SparseJVMatcher,
+    "greedy": GreedyMatcher,
+    "auction": AuctionMatcher,
+}
+
+
+def get_matcher(
+    matcher: Union[str, Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]],
+) -> Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+    """Returns the assignment backend registered under a name in MATCHERS, or the given callable.
+
+    A backend is called with a cost matrix of shape (n, m) and returns the sorted indices of the
+    assigned rows and the columns assigned to them. It may also provide solve_sparse(rows, cols, costs, num_cols)
+    to match candidate pairs directly, which is used with gating.
+    """
+    if callable(matcher):
+        return matcher
+    if matcher not in MATCHERS:
+        raise ValueError(
+            f"Unknown matcher '{matcher}', expected one of {', '.join(MATCHERS)}"
+        )
+    return MATCHERS[matcher]()
@@ -0,0 +1,277 @@
+from typing import Callable, Dict, List, Optional, Sequence, Union
+import numpy as np
+from object_tracking.algorithms.cost import batched_cost_matrix
+from object_tracking.algorithms.matching import get_matcher
+from object_tracking.algorithms.object_detection import TrackStore
+from object_tracking.utils.io.columnar import FrameDetections
+
+
+class StreamTrackStore(TrackStore):
+    _columns = TrackStore._columns + ("_streams",)
+
+    def __init__(
+        self,
+        dt: float = 1.0,
+        alpha: float = 0.25,
+        beta: float = 0.0025,
+        capacity: int = 16,
+    ) -> None:
+        """Initializes a struct-of-arrays store of the tracks of many streams sharing one alpha-beta filter bank.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Time step between frames (seconds), by default 1.0
+        alpha : float, optional
+            Alpha parameter for the alpha-beta filters, by default 0.25
+        beta : float, optional
+            Beta parameter for the alpha-beta filters, by default 0.0025
+        capacity : int, optional
+            Initial number of tracks the store can hold before growing, by default 16
+        """
+        super().__init__(dt=dt, alpha=alpha, beta=beta, capacity=capacity)
+        self._streams = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def streams(self) -> np.ndarray:
+        """Array of shape (N,) of the stream of each track."""
+        return self._streams[: len(self)]
+
+    def add(self, ids: np.ndarray, boxes: np.ndarray, streams: np.ndarray) -> None:
+        """Starts new tracks from detected bounding boxes.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Array of shape (K,) of identifiers for the new tracks, unique within each stream.
+        boxes : np.ndarray
+            Array of shape (K, 4) of bounding boxes as (x_min, y_min, width, height).
+        streams : np.ndarray
+            Array of shape (K,) of the stream of each new track.
+        """
+        n = len(self)
+        super().add(ids, boxes)
+        self._streams[n : n + len(boxes)] = streams
+
+
+class MultiStreamMatcher:
+    def __init__(
+        self,
+        num_streams: int,
+        max_distance_threshold: float,
+        max_frame_skipped: int,
+        fps: int,
+        metric: str = "centroid",
+        metric_weights: Optional[Dict[str, float]] = None,
+        alpha: float = 0.25,
+        beta: float = 0.0025,
+        matcher: Union[str, Callable] = "hungarian",
+        batch_entries: int = 1 << 16,
+    ) -> None:
+        """Tracks many independent streams of bounding boxes, stepping all of them in one call.
+
+        The tracks of every stream share one StreamTrackStore, so the filters of all streams are
+        corrected in one vectorized step, the cost matrices are computed in padded batches of streams
+        of similar size and tracks are started and removed for all streams at once. Only the assignment
+        runs per stream. Each stream gets the same track identifiers as its own BoundingBoxMatcher would
+        give it, without gating, instrumentation or history.
+
+        Parameters
+        ----------
+        num_streams : int
+            Number of streams.
+        max_distance_threshold : float
+            Maximum distance threshold for matching tracks with detections.
+        max_frame_skipped : int
+            Maximum number of frames to skip before a track is removed.
+        fps : int
+            Frames per second of the videos.
+        metric : str, optional
+            Cost metric used for matching, one of "centroid", "iou", "giou" or "mix", by default "centroid"
+        metric_weights : Optional[Dict[str, float]], optional
+            Weight of each metric when metric is "mix", e.g. {"centroid": 0.5, "iou": 0.5}, by default None
+        alpha : float, optional
+            Alpha parameter for the alpha-beta filter of each track, by default 0.25
+        beta : float, optional
+            Beta parameter for the alpha-beta filter of each track, by default 0.0025
+        matcher : Union[str, Callable], optional
+            Assignment backend, see BoundingBoxMatcher, by default "hungarian"
+        batch_entries : int, optional
+            Largest number of padded cost matrix entries computed in one batch, by default 1 << 16
+        """
+        self.num_streams = num_streams
+        self.max_distance_threshold = max_distance_threshold
+        self.max_frame_skipped = max_frame_skipped
+        self.metric = metric
+        self.metric_weights = metric_weights
+        self.tracks = StreamTrackStore(dt=1.0 / fps, alpha=alpha, beta=beta)
+        self.track_ids = np.zeros(num_streams, dtype=np.int64)
+        self.matcher = get_matcher(matcher)
+        self.batch_entries = batch_entries
+
+    def step(
+        self, frames: Sequence[Optional[np.ndarray]]
+    ) -> List[Optional[np.ndarray]]:
+        """Updates the tracks of every stream with the bounding boxes of its next frame.
+
+        Parameters
+        ----------
+        frames : Sequence[Optional[np.ndarray]]
+            Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height) for each stream,
+            or None for a stream without a new frame, whose tracks are left as they are.
+
+        Returns
+        -------
+        ids : List[Optional[np.ndarray]]
+            Array of shape (D,) of the track identifier assigned to each bounding box of each stream,
+            None for the streams without a new frame.
+        """
+        if len(frames) != self.num_streams:
+            raise ValueError(f"Expected {self.num_streams} frames, got {len(frames)}")
+        active = np.array([frame is not None for frame in frames])
+        num_detections = np.array(
+            [0 if frame is None else len(frame) for frame in frames], dtype=np.int64
+        )
+        detection_offsets = np.zeros(self.num_streams + 1, dtype=np.int64)
+        detection_offsets[1:] = np.cumsum(num_detections)
+        boxes = np.concatenate(
+            [np.zeros((0, 4))]
+            + [
+                np.asarray(frame, dtype=np.float64).reshape(-1, 4)
+                for frame in frames
+                if frame is not None
+            ]
+        )
+        detection_streams = np.repeat(np.arange(self.num_streams), num_detections)
+        detection_ranks = np.arange(len(boxes)) - detection_offsets[detection_streams]
+
+        # Group the tracks by stream, keeping their order within each stream
+        streams = self.tracks.streams
+        track_order = np.argsort(streams, kind="stable")
+        num_tracks = np.bincount(streams, minlength=self.num_streams)
+        track_offsets = np.zeros(self.num_streams + 1, dtype=np.int64)
+        track_offsets[1:] = np.cumsum(num_tracks)
+        track_ranks = np.empty(len(streams), dtype=np.int64)
+        track_ranks[track_order] = (
+            np.arange(len(streams)) - track_offsets[streams[track_order]]
+        )
+
+        # Pad the tracks and detections of every stream to the largest stream
+        max_tracks = num_tracks.max(initial=0)
+        max_detections = num_detections.max(initial=0)
+        predictions = np.zeros((self.num_streams, max_tracks, 2))
+        sizes = np.zeros((self.num_streams, max_tracks, 2))
+        predictions[streams, track_ranks] = self.tracks.predictions
+        sizes[streams, track_ranks] = self.tracks.sizes
+        padded_boxes = np.zeros((self.num_streams, max_detections, 4))
+        padded_boxes[detection_streams, detection_ranks] = boxes
+
+        # Streams of similar size are batched together, in chunks whose temporaries stay in cache,
+        # and each stream of a chunk is solved, mapping its matches back to store and detection rows
+        row_inds, col_inds, match_costs = [], [], []
+        solved = np.nonzero(active & (num_tracks > 0) & (num_detections > 0))[0]
+        solved = solved[np.argsort(num_tracks[solved] * num_detections[solved])]
+        start = 0
+        while start < len(solved):
+            entries = (
+                np.arange(1, len(solved) - start + 1)
+                * np.maximum.accumulate(num_tracks[solved[start:]])
+                * np.maximum.accumulate(num_detections[solved[start:]])
+            )
+            end = start + max(
+                int(np.searchsorted(entries, self.batch_entries, side="right")), 1
+            )
+            chunk = solved[start:end]
+            chunk_tracks = num_tracks[chunk].max()
+            chunk_detections = num_detections[chunk].max()
+            costs = batched_cost_matrix(
+                predictions[chunk, :chunk_tracks],
+                sizes[chunk, :chunk_tracks],
+                padded_boxes[chunk, :chunk_detections],
+                num_tracks[chunk],
+                num_detections[chunk],
+                metric=self.metric,
+                weights=self.metric_weights,
+            )
+            for stream, stream_costs in zip(chunk, costs):
+                stream_costs = stream_costs[
+                    : num_tracks[stream], : num_detections[stream]
+                ]
+                stream_rows, stream_cols = self.matcher(stream_costs)
+                row_inds.append(track_order[track_offsets[stream] + stream_rows])
+                col_inds.append(detection_offsets[stream] + stream_cols)
+                match_costs.append(stream_costs[stream_rows, stream_cols])
+            start = end
+        row_inds = np.concatenate([np.zeros(0, dtype=np.int64)] + row_inds)
+        col_inds = np.concatenate([np.zeros(0, dtype=np.int64)] + col_inds)
+        match_costs = np.concatenate([np.zeros(0)] + match_costs)
+
+        # Update the matched tracks of all streams at once
+        accepted = match_costs <= self.max_distance_threshold
+        row_inds, col_inds = row_inds[accepted], col_inds[accepted]
+        ids = np.zeros(len(boxes), dtype=np.int64)
+        ids[col_inds] = self.tracks.ids[row_inds]
+        self.tracks.update(row_inds, boxes[col_inds])
+
+        # Only the tracks of streams with a new frame skip it when unmatched
+        unassigned_tracks = active[streams]
+        unassigned_tracks[row_inds] = False
+        self.tracks.skipped_frames[unassigned_tracks] += 1
+
+        # Start tracks for the unmatched detections, numbered per stream
+        unassigned = np.ones(len(boxes), dtype=bool)
+        unassigned[col_inds] = False
+        birth_streams = detection_streams[unassigned]
+        births = np.bincount(birth_streams, minlength=self.num_streams)
+        birth_offsets = np.cumsum(births) - births
+        new_ids = (
+            self.track_ids[birth_streams]
+            + np.arange(len(birth_streams))
+            - birth_offsets[birth_streams]
+        )
+        self.track_ids += births
+        ids[unassigned] = new_ids
+        self.tracks.add(new_ids, boxes[unassigned], birth_streams)
+
+        self.tracks.prune(self.max_frame_skipped)
+
+        return [
+            (
+                ids[detection_offsets[stream] : detection_offsets[stream + 1]]
+                if frames[stream] is not None
+                else None
+            )
+            for stream in range(self.num_streams)
+        ]
+
+    def fit_columnar(
+        self, detections: Sequence[FrameDetections]
+    ) -> List[FrameDetections]:
+        """Tracks the detections of every stream, stepping all streams together until the longest ends.
+
+        Parameters
+        ----------
+        detections : Sequence[FrameDetections]
+            Bounding boxes of each frame of each stream.
+
+        Returns
+        -------
+        tracked_detections : List[FrameDetections]
+            The same bounding boxes of each stream with the identifier of the track of each one.
+        """
+        ids = [np.empty(len(stream.boxes), dtype=np.int64) for stream in detections]
+        for frame in range(max((len(stream) for stream in detections), default=0)):
+            frame_ids = self.step(
+                [
+                    stream[frame] if frame < len(stream) else None
+                    for stream in detections
+                ]
+            )
+            for stream, stream_ids in enumerate(frame_ids):
+                if stream_ids is not None:
+                    offsets = detections[stream].offsets
+                    ids[stream][offsets[frame] : offsets[frame + 1]] = stream_ids
+        return [
+            FrameDetections(stream.offsets, stream.boxes, stream_ids)
+            for stream, stream_ids in zip(detections, ids)
+        ]
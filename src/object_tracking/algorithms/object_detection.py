@@ -1,8 +1,47 @@
+import time
 import numpy as np
-import numpy.linalg as LA
-from typing import Dict, List
-from object_tracking.algorithms.matching import HungarianMatcher
-from object_tracking.algorithms.object_tracking import AlphaBetaFilter2D
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from object_tracking import MISSING_VALUE
+from object_tracking.algorithms.budget import PATHS, LatencyBudget
+from object_tracking.algorithms.cost import cost_matrix
+from object_tracking.algorithms.gating import gate_pairs, split_components
+from object_tracking.algorithms.history import TrackHistory
+from object_tracking.algorithms.matching import (
+    GreedyMatcher,
+    HungarianMatcher,
+    get_matcher,
+)
+from object_tracking.utils.instrumentation import Instrumentation
+from object_tracking.utils.io.columnar import FrameDetections
+from object_tracking.algorithms.object_tracking import (
+    AlphaBetaFilter2D,
+    AlphaBetaFilterBank2D,
+)
+
+# Cost given to pairs outside the gate so the solver only picks them when it has to
+GATED_COST = 1e6
+
+
+def detections_to_array(detections: List[Dict[str, int]]) -> np.ndarray:
+    """Converts a list of detections to an array of bounding boxes.
+
+    Parameters
+    ----------
+    detections : List[Dict[str, int]]
+        List of detections in a frame.
+
+    Returns
+    -------
+    boxes : np.ndarray
+        Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height).
+    """
+    return np.array(
+        [
+            [det["x_min"], det["y_min"], det["width"], det["height"]]
+            for det in detections
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 4)
 
 
 class Track:
@@ -58,50 +97,228 @@ class Track:
         """
         measurement = (bbox["x_min"], bbox["y_min"])
         self.prediction = self.filter(measurement)
+        self.size = (bbox["width"], bbox["height"])
         self.skipped_frames = 0
 
 
+class TrackStore:
+    # Per-track arrays kept in the same order as the filters
+    _columns = ("_ids", "_skipped_frames", "_predictions", "_sizes")
+
+    def __init__(
+        self,
+        dt: float = 1.0,
+        alpha: float = 0.25,
+        beta: float = 0.0025,
+        capacity: int = 16,
+    ) -> None:
+        """Initializes a struct-of-arrays store of tracks sharing one alpha-beta filter bank.
+
+        Parameters
+        ----------
+        dt : float, optional
+            Time step between frames (seconds), by default 1.0
+        alpha : float, optional
+            Alpha parameter for the alpha-beta filters, by default 0.25
+        beta : float, optional
+            Beta parameter for the alpha-beta filters, by default 0.0025
+        capacity : int, optional
+            Initial number of tracks the store can hold before growing, by default 16
+        """
+        self.filters = AlphaBetaFilterBank2D(
+            alpha=alpha, beta=beta, dt=dt, capacity=capacity
+        )
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._skipped_frames = np.zeros(capacity, dtype=np.int64)
+        self._predictions = np.zeros((capacity, 2))
+        self._sizes = np.zeros((capacity, 2))
+
+    def __len__(self) -> int:
+        return len(self.filters)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Array of shape (N,) of track identifiers."""
+        return self._ids[: len(self)]
+
+    @property
+    def skipped_frames(self) -> np.ndarray:
+        """Array of shape (N,) of consecutive frames each track went unmatched."""
+        return self._skipped_frames[: len(self)]
+
+    @property
+    def predictions(self) -> np.ndarray:
+        """Array of shape (N, 2) of the latest corrected coordinates of each track, truncated like AlphaBetaFilter2D."""
+        return self._predictions[: len(self)]
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """Array of shape (N, 2) of the (width, height) of the last box matched to each track."""
+        return self._sizes[: len(self)]
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in self._columns:
+            old = getattr(self, name)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[: len(self)] = old[: len(self)]
+            setattr(self, name, grown)
+
+    def add(self, ids: np.ndarray, boxes: np.ndarray) -> None:
+        """Starts new tracks from detected bounding boxes.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Array of shape (K,) of identifiers for the new tracks.
+        boxes : np.ndarray
+            Array of shape (K, 4) of bounding boxes as (x_min, y_min, width, height).
+        """
+        n, k = len(self), len(boxes)
+        self._reserve(n + k)
+        self._ids[n : n + k] = ids
+        # Filters start at the box centroid and are corrected with the first measurement, like Track
+        index = self.filters.add(boxes[:, :2] + boxes[:, 2:4] / 2, np.zeros((k, 2)))
+        self.update(index, boxes)
+
+    def update(self, index: np.ndarray, boxes: np.ndarray) -> None:
+        """Corrects the selected tracks with their matched bounding boxes.
+
+        Parameters
+        ----------
+        index : np.ndarray
+            Indices of the K tracks to update.
+        boxes : np.ndarray
+            Array of shape (K, 4) of bounding boxes as (x_min, y_min, width, height).
+        """
+        self._predictions[index] = np.trunc(self.filters(boxes[:, :2], index))
+        self._sizes[index] = boxes[:, 2:4]
+        self._skipped_frames[index] = 0
+
+    def prune(self, max_frame_skipped: int) -> np.ndarray:
+        """Removes tracks that have exceeded the max_frame_skipped threshold.
+
+        Parameters
+        ----------
+        max_frame_skipped : int
+            Maximum number of frames to skip before a track is removed.
+
+        Returns
+        -------
+        removed_ids : np.ndarray
+            Identifiers of the removed tracks.
+        """
+        keep = self.skipped_frames <= max_frame_skipped
+        if keep.all():
+            return np.zeros(0, dtype=np.int64)
+        removed_ids = self.ids[~keep]
+        k = int(np.count_nonzero(keep))
+        for name in self._columns:
+            array = getattr(self, name)
+            array[:k] = array[: len(self)][keep]
+        self.filters.compact(keep)
+        return removed_ids
+
+
 class BoundingBoxMatcher:
     def __init__(
         self,
-        bounding_boxes: Dict[str, List[Dict[str, int]]],
+        bounding_boxes: Optional[Dict[str, List[Dict[str, int]]]],
         max_distance_threshold: float,
         max_frame_skipped: int,
         fps: int,
+        metric: str = "centroid",
+        metric_weights: Optional[Dict[str, float]] = None,
+        alpha: float = 0.25,
+        beta: float = 0.0025,
+        gate_distance: Optional[float] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        warm_start: bool = False,
+        matcher: Union[str, Callable] = "hungarian",
+        history: Optional[TrackHistory] = None,
+        budget: Optional[LatencyBudget] = None,
     ) -> None:
         """Initializes the bounding box matcher.
 
         Parameters
         ----------
-        bounding_boxes : Dict[str, List[Dict[str, int]]]
-            Bounding boxes of the object in each frame.
+        bounding_boxes : Optional[Dict[str, List[Dict[str, int]]]]
+            Bounding boxes of the object in each frame, or None when frames are only passed to stream.
         max_distance_threshold : float
             Maximum distance threshold for matching tracks with detections.
         max_frame_skipped : int
             Maximum number of frames to skip before a track is removed.
         fps : int
             Frames per second of the video.
+        metric : str, optional
+            Cost metric used for matching, one of "centroid", "iou", "giou" or "mix", by default "centroid"
+        metric_weights : Optional[Dict[str, float]], optional
+            Weight of each metric when metric is "mix", e.g. {"centroid": 0.5, "iou": 0.5}, by default None
+        alpha : float, optional
+            Alpha parameter for the alpha-beta filter of each track, by default 0.25
+        beta : float, optional
+            Beta parameter for the alpha-beta filter of each track, by default 0.0025
+        gate_distance : Optional[float], optional
+            If set, only tracks and detections whose centroids are within this distance (pixels) can be matched,
+            the centroid metric is normalized by it instead of the largest distance in the frame, and each
+            independent group of candidate pairs is solved separately, by default None
+        instrumentation : Optional[Instrumentation], optional
+            Receives the time spent in each stage of every update and counters of tracks alive, births, deaths,
+            matches rejected by max_distance_threshold and cost matrix size, by default None
+        warm_start : bool, optional
+            Whether to solve each assignment from the greedy matching of the reduced cost matrix, which only
+            runs augmenting paths for the tracks that compete for a detection. Ties may be broken differently.
+            Same as matcher="incremental", by default False
+        matcher : Union[str, Callable], optional
+            Assignment backend, one of "hungarian", "incremental", "scipy", "sparse_jv" (exact), "greedy" or "auction"
+            (approximate), or a callable with the same interface, see object_tracking.algorithms.matching.MATCHERS.
+            With gate_distance, a backend with solve_sparse matches all candidate pairs at once, by default "hungarian"
+        history : Optional[TrackHistory], optional
+            Archives the bounding box of every track in each frame, and the rest of each track once it is removed,
+            by default None
+        budget : Optional[LatencyBudget], optional
+            Time budget of each update. Frames predicted to overrun it are associated by a cheaper path: greedy
+            matching, greedy matching of the gated pairs, whose centroid costs are normalized by the gate distance,
+            or no association at all, where every track coasts on its prediction as if unmatched and detections get
+            MISSING_VALUE instead of an identifier. The path of the last frame is budget.path, by default None
         """
         self.bounding_boxes = bounding_boxes
         self.max_distance_threshold = max_distance_threshold
         self.max_frame_skipped = max_frame_skipped
-        self.tracks: List[Track] = []
+        self.tracks = TrackStore(dt=1.0 / fps, alpha=alpha, beta=beta)
         self.track_id = 0
         self.fps = fps
-        self.matcher = HungarianMatcher()
+        self.metric = metric
+        self.metric_weights = metric_weights
+        self.gate_distance = gate_distance
+        self.instrumentation = instrumentation
+        self.history = history
+        self.budget = budget
+        self.matcher = get_matcher(
+            "incremental" if warm_start and matcher == "hungarian" else matcher
+        )
 
-    def _add_new_track(self, bbox: Dict[str, int]) -> None:
-        """Adds a new track to the list of tracks.
+    def _add_new_tracks(self, boxes: np.ndarray) -> np.ndarray:
+        """Adds new tracks to the track store.
 
         Parameters
         ----------
-        bbox : Dict[str, int]
-            Bounding box of the object.
+        boxes : np.ndarray
+            Array of shape (K, 4) of bounding boxes as (x_min, y_min, width, height).
+
+        Returns
+        -------
+        ids : np.ndarray
+            Identifiers of the new tracks.
         """
-        dt = 1.0 / self.fps
-        track = Track(track_id=self.track_id, bbox=bbox, dt=dt)
-        self.tracks.append(track)
-        self.track_id += 1
+        ids = np.arange(self.track_id, self.track_id + len(boxes))
+        self.tracks.add(ids, boxes)
+        self.track_id += len(boxes)
+        return ids
 
     def fit(self) -> Dict[str, List[Dict[str, int]]]:
         """Fits the bounding box matcher to the data.
@@ -111,23 +328,50 @@ class BoundingBoxMatcher:
         self.bounding_boxes : Dict[str, List[Dict[str, int]]]
             Bounding boxes of the object in each frame.
         """
-        for frame in range(len(self.bounding_boxes)):
-            detections = self.bounding_boxes[str(frame)]
-            self.update(detections)
+        frames = (self.bounding_boxes[str(f)] for f in range(len(self.bounding_boxes)))
+        for _ in self.stream(frames):
+            pass
 
         return self.bounding_boxes
 
-    def _init_tracks(self, detections: List[Dict[str, int]]) -> None:
-        """Initializes the tracks with the first set of detections.
+    def fit_columnar(self, detections: FrameDetections) -> FrameDetections:
+        """Fits the bounding box matcher to detections in the columnar format without building dicts.
+
+        Parameters
+        ----------
+        detections : FrameDetections
+            Bounding boxes of the object in each frame, possibly memory-mapped.
+
+        Returns
+        -------
+        tracked_detections : FrameDetections
+            The same bounding boxes with the identifier of the track of each one.
+        """
+        ids = np.empty(len(detections.boxes), dtype=np.int64)
+        offsets = detections.offsets
+        for frame in range(len(detections)):
+            ids[offsets[frame] : offsets[frame + 1]] = self._update(detections[frame])
+
+        return FrameDetections(detections.offsets, detections.boxes, ids)
+
+    def stream(
+        self, frames: Iterable[List[Dict[str, int]]]
+    ) -> Iterator[List[Dict[str, int]]]:
+        """Tracks bounding boxes frame by frame, holding only the current frame in memory.
 
         Parameters
         ----------
+        frames : Iterable[List[Dict[str, int]]]
+            Detections of each frame in order, e.g. from iter_bounding_boxes.
+
+        Yields
+        ------
         detections : List[Dict[str, int]]
-            List of detections in the first frame.
+            Detections of the frame with their track "id" set.
         """
-        for i, det in enumerate(detections):
-            self._add_new_track(det)
-            detections[i]["id"] = self.tracks[i].track_id
+        for detections in frames:
+            self.update(detections)
+            yield detections
 
     def update(self, detections: List[Dict[str, int]]) -> None:
         """Updates the tracks with the new set of detections.
@@ -137,73 +381,298 @@ class BoundingBoxMatcher:
         detections : List[Dict[str, int]]
             List of detections in the current frame.
         """
-        if not self.tracks:
-            self._init_tracks(detections)
-            return
+        ids = self._update(detections_to_array(detections))
+        for det, track_id in zip(detections, ids.tolist()):
+            det["id"] = track_id
 
-        # Create the cost matrix
-        cost_matrix = self._calculate_cost_matrix(detections)
+    def _update(self, boxes: np.ndarray) -> np.ndarray:
+        """Updates the tracks with the new set of bounding boxes.
 
-        # Apply the Hungarian algorithm
-        row_inds, col_inds = self.matcher(cost_matrix)
+        Parameters
+        ----------
+        boxes : np.ndarray
+            Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height) in the current frame.
+
+        Returns
+        -------
+        ids : np.ndarray
+            Array of shape (D,) of the track identifier assigned to each bounding box.
+        """
+        ids = np.zeros(len(boxes), dtype=np.int64)
+        # Timestamps are cheap enough to take unconditionally, the counters are only built when instrumented
+        clock = time.perf_counter
+        start = clock()
+
+        # Pick the association that fits in the time budget
+        num_tracks = len(self.tracks)
+        path = "exact"
+        if self.budget is not None:
+            path = self.budget.choose(
+                num_tracks,
+                len(boxes),
+                self.gate_distance,
+                # Gated components are solved transposed when tall
+                solves_rows=(
+                    self.gate_distance is None
+                    and isinstance(self.matcher, HungarianMatcher)
+                ),
+            )
+        matcher = self.matcher if path == "exact" else GreedyMatcher()
+        gate_distance = self.gate_distance
+        if path == "gated" and self.budget.gate_distance is not None:
+            gate_distance = self.budget.gate_distance
+
+        # Match tracks with detections
+        if path == "coast":
+            pair_costs = np.zeros(0)
+            cost_done = clock()
+            row_inds = col_inds = np.zeros(0, dtype=np.int64)
+            costs = np.zeros(0)
+        elif gate_distance is None:
+            pair_costs = self._calculate_cost_matrix(boxes)
+            cost_done = clock()
+            row_inds, col_inds, costs = self._assign(pair_costs, matcher)
+        else:
+            pair_costs = self._gated_pair_costs(boxes, gate_distance)
+            cost_done = clock()
+            row_inds, col_inds, costs = self._assign_gated(
+                *pair_costs, len(boxes), matcher
+            )
+        assign_done = clock()
 
         # Update tracks based on the assignment
-        assigned_tracks = set()
-        assigned_detections = set()
-        for r, c in zip(row_inds, col_inds):
-            if cost_matrix[r, c] <= self.max_distance_threshold:
-                detections[c]["id"] = self.tracks[r].track_id
-                self.tracks[r].update(detections[c])
-                assigned_tracks.add(r)
-                assigned_detections.add(c)
+        accepted = costs <= self.max_distance_threshold
+        row_inds, col_inds = row_inds[accepted], col_inds[accepted]
+        ids[col_inds] = self.tracks.ids[row_inds]
+        self.tracks.update(row_inds, boxes[col_inds])
 
         # Increment skipped frames for unmatched tracks
-        for i in range(len(self.tracks)):
-            if i not in assigned_tracks:
-                self.tracks[i].skipped_frames += 1
+        unassigned_tracks = np.ones(len(self.tracks), dtype=bool)
+        unassigned_tracks[row_inds] = False
+        self.tracks.skipped_frames[unassigned_tracks] += 1
+        filter_done = clock()
 
-        # Add new tracks for unmatched detections
-        for i in range(len(detections)):
-            if i not in assigned_detections:
-                self._add_new_track(detections[i])
-                detections[i]["id"] = self.tracks[-1].track_id
+        # Add new tracks for unmatched detections, which are left unlabelled when coasting
+        unassigned_detections = np.ones(len(boxes), dtype=bool)
+        unassigned_detections[col_inds] = False
+        if path == "coast":
+            ids[unassigned_detections] = MISSING_VALUE
+        else:
+            ids[unassigned_detections] = self._add_new_tracks(
+                boxes[unassigned_detections]
+            )
+        birth_done = clock()
 
         # Remove tracks that have exceeded the max_frame_skipped threshold
-        self.tracks = [
-            track
-            for track in self.tracks
-            if track.skipped_frames <= self.max_frame_skipped
-        ]
+        removed_ids = self.tracks.prune(self.max_frame_skipped)
+        if self.history is not None:
+            labelled = ids != MISSING_VALUE
+            self.history.record(ids[labelled], boxes[labelled])
+            self.history.finish(removed_ids)
+        prune_done = clock()
 
-    def _calculate_cost_matrix(self, detections: List[Dict[str, int]]) -> np.ndarray:
-        """Calculates the cost matrix for the Hungarian algorithm.
+        if self.budget is not None:
+            self.budget.observe(
+                path,
+                num_tracks,
+                len(boxes),
+                assign_done - start,
+                prune_done - assign_done,
+            )
+
+        if self.instrumentation is not None:
+            self.instrumentation.record(
+                {
+                    "cost": cost_done - start,
+                    "assign": assign_done - cost_done,
+                    "filter": filter_done - assign_done,
+                    "birth": birth_done - filter_done,
+                    "prune": prune_done - birth_done,
+                },
+                {
+                    "detections": len(boxes),
+                    "cost_entries": (
+                        pair_costs.size
+                        if isinstance(pair_costs, np.ndarray)
+                        else len(pair_costs[2])
+                    ),
+                    "matches": len(row_inds),
+                    "rejected": int(np.count_nonzero(~accepted)),
+                    "births": (0 if path == "coast" else len(boxes) - len(col_inds)),
+                    "deaths": len(removed_ids),
+                    "tracks_alive": len(self.tracks),
+                    **{f"path_{name}": int(name == path) for name in PATHS},
+                },
+            )
+
+        return ids
+
+    def _assign(
+        self, cost_matrix: np.ndarray, matcher: Optional[Callable] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Matches every track with every detection through one dense cost matrix.
 
         Parameters
         ----------
-        detections : List[Dict[str, int]]
-            List of detections in the current frame.
+        cost_matrix : np.ndarray
+            Array of shape (T, D) of the cost of each track and detection.
+        matcher : Optional[Callable], optional
+            Assignment backend, by default self.matcher
 
         Returns
         -------
-        normalized_cost_matrix : np.ndarray
-            Cost matrix for the Hungarian algorithm normalized by the maximum distance [0, 1].
+        row_inds : np.ndarray
+            Indices of the matched tracks.
+        col_inds : np.ndarray
+            Indices of the detections matched to each track in row_inds.
+        costs : np.ndarray
+            Cost of each match.
         """
-        num_tracks = len(self.tracks)
-        num_detections = len(detections)
-        cost_matrix = np.zeros((num_tracks, num_detections))
-
-        for i, track in enumerate(self.tracks):
-            for j, det in enumerate(detections):
-                track_centroid = np.array(track.prediction)
-                det_centroid = np.array(
-                    [
-                        det["x_min"] + det["width"] / 2.0,
-                        det["y_min"] + det["height"] / 2.0,
-                    ]
+        # Apply the Hungarian algorithm
+        row_inds, col_inds = (matcher or self.matcher)(cost_matrix)
+
+        return row_inds, col_inds, cost_matrix[row_inds, col_inds]
+
+    def _gated_pair_costs(
+        self, boxes: np.ndarray, gate_distance: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Calculates the cost of the track and detection pairs within the gate distance.
+
+        Parameters
+        ----------
+        boxes : np.ndarray
+            Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height) in the current frame.
+        gate_distance : Optional[float], optional
+            Gate distance (pixels), by default self.gate_distance
+
+        Returns
+        -------
+        rows : np.ndarray
+            Track index of each candidate pair.
+        cols : np.ndarray
+            Detection index of each candidate pair.
+        costs : np.ndarray
+            Cost of each candidate pair.
+        """
+        if gate_distance is None:
+            gate_distance = self.gate_distance
+        predictions, sizes = self.tracks.predictions, self.tracks.sizes
+        rows, cols = gate_pairs(predictions, boxes, gate_distance)
+        costs = cost_matrix(
+            predictions[rows],
+            sizes[rows],
+            boxes[cols],
+            metric=self.metric,
+            weights=self.metric_weights,
+            max_distance=gate_distance,
+            paired=True,
+        )
+        return rows, cols, costs
+
+    def _assign_gated(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        costs: np.ndarray,
+        num_detections: int,
+        matcher: Optional[Callable] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Matches tracks with detections within the gate distance, solving each connected component separately.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            Track index of each candidate pair, from _gated_pair_costs.
+        cols : np.ndarray
+            Detection index of each candidate pair.
+        costs : np.ndarray
+            Cost of each candidate pair.
+        num_detections : int
+            Number of detections in the current frame.
+        matcher : Optional[Callable], optional
+            Assignment backend, by default self.matcher
+
+        Returns
+        -------
+        row_inds : np.ndarray
+            Indices of the matched tracks.
+        col_inds : np.ndarray
+            Indices of the detections matched to each track in row_inds.
+        costs : np.ndarray
+            Cost of each match.
+        """
+        matcher = matcher or self.matcher
+        isolated, components = split_components(
+            rows, cols, len(self.tracks), num_detections
+        )
+
+        # A pair that is alone in its component is its own optimal assignment
+        row_inds, col_inds, match_costs = (
+            [rows[isolated]],
+            [cols[isolated]],
+            [costs[isolated]],
+        )
+        solve_sparse = getattr(matcher, "solve_sparse", None)
+        if solve_sparse is not None and components:
+            # Sparse backends solve every component at once from the candidate pairs
+            pairs = np.concatenate(components)
+            sparse_row_inds, sparse_col_inds = solve_sparse(
+                rows[pairs], cols[pairs], costs[pairs], num_detections
+            )
+            # Look up the cost of each match by its position among the sorted pair keys
+            keys = rows[pairs] * num_detections + cols[pairs]
+            order = np.argsort(keys)
+            matched = order[
+                np.searchsorted(
+                    keys[order], sparse_row_inds * num_detections + sparse_col_inds
                 )
-                cost_matrix[i, j] = LA.norm(track_centroid - det_centroid)
+            ]
+            row_inds.append(sparse_row_inds)
+            col_inds.append(sparse_col_inds)
+            match_costs.append(costs[pairs][matched])
+            components = []
+        for pairs in components:
+            track_index, component_rows = np.unique(rows[pairs], return_inverse=True)
+            detection_index, component_cols = np.unique(
+                cols[pairs], return_inverse=True
+            )
+            # Pairs outside the gate can still be forced together by the solver, so make them unacceptable
+            component_costs = np.full(
+                (len(track_index), len(detection_index)), GATED_COST
+            )
+            component_costs[component_rows, component_cols] = costs[pairs]
 
-        max_distance = np.max(cost_matrix)
-        normalized_cost_matrix = cost_matrix / max_distance
+            # The solver runs one phase per row, so tall components are solved transposed
+            if len(track_index) > len(detection_index):
+                component_col_inds, component_row_inds = matcher(component_costs.T)
+            else:
+                component_row_inds, component_col_inds = matcher(component_costs)
+            row_inds.append(track_index[component_row_inds])
+            col_inds.append(detection_index[component_col_inds])
+            match_costs.append(component_costs[component_row_inds, component_col_inds])
 
-        return normalized_cost_matrix
+        row_inds, col_inds = np.concatenate(row_inds), np.concatenate(col_inds)
+        match_costs = np.concatenate(match_costs)
+        order = np.argsort(row_inds)
+        return row_inds[order], col_inds[order], match_costs[order]
+
+    def _calculate_cost_matrix(self, boxes: np.ndarray) -> np.ndarray:
+        """Calculates the cost matrix for the Hungarian algorithm.
+
+        Parameters
+        ----------
+        boxes : np.ndarray
+            Array of shape (D, 4) of bounding boxes as (x_min, y_min, width, height) in the current frame.
+
+        Returns
+        -------
+        normalized_cost_matrix : np.ndarray
+            Cost matrix for the Hungarian algorithm normalized to [0, 1].
+        """
+        return cost_matrix(
+            self.tracks.predictions,
+            self.tracks.sizes,
+            boxes,
+            metric=self.metric,
+            weights=self.metric_weights,
+        )
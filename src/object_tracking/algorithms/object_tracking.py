@@ -1,8 +1,45 @@
 from typing import Tuple
 import numpy as np
 from object_tracking import MISSING_VALUE
-import cv2
-import cv2.typing
+
+
+def _compose_affine_scan(
+    maps: Tuple[np.ndarray, ...],
+) -> Tuple[np.ndarray, ...]:
+    """Inclusive prefix composition of 2D affine maps along the last axis.
+
+    Each map sends a state (x, v) to (a * x + b * v + e, c * x + d * v + f). Element t of
+    the result is the composition of maps 0..t, computed with log2(T) vectorized steps.
+
+    Parameters
+    ----------
+    maps : Tuple[np.ndarray, ...]
+        The (a, b, c, d, e, f) coefficients, each an array of shape (..., T).
+
+    Returns
+    -------
+    composed_maps : Tuple[np.ndarray, ...]
+        The (a, b, c, d, e, f) coefficients of the composed maps, each an array of shape (..., T).
+    """
+    a, b, c, d, e, f = (np.array(m, dtype=np.float64) for m in maps)
+    T = a.shape[-1]
+    shift = 1
+    while shift < T:
+        # Compose each map with the composition ending `shift` steps earlier
+        a1, b1, c1, d1, e1, f1 = (m[..., :-shift] for m in (a, b, c, d, e, f))
+        a2, b2, c2, d2, e2, f2 = (m[..., shift:] for m in (a, b, c, d, e, f))
+        a_new = a2 * a1 + b2 * c1
+        b_new = a2 * b1 + b2 * d1
+        c_new = c2 * a1 + d2 * c1
+        d_new = c2 * b1 + d2 * d1
+        e_new = a2 * e1 + b2 * f1 + e2
+        f_new = c2 * e1 + d2 * f1 + f2
+        for m, m_new in zip(
+            (a, b, c, d, e, f), (a_new, b_new, c_new, d_new, e_new, f_new)
+        ):
+            m[..., shift:] = m_new
+        shift *= 2
+    return a, b, c, d, e, f
 
 
 class AlphaBetaFilter2D:
@@ -91,17 +128,17 @@ class AlphaBetaFilter2D:
 
         return corrected_measurement
 
-    def predict(self, measurements: cv2.typing.MatLike) -> cv2.typing.MatLike:
+    def predict(self, measurements: np.ndarray) -> np.ndarray:
         """Predicts the 2D coordinates of the object.
 
         Parameters
         ----------
-        measurements : cv2.typing.MatLike
+        measurements : np.ndarray
             Array of 2D coordinates of the object.
 
         Returns
         -------
-        predicted_measurements : cv2.typing.MatLike
+        predicted_measurements : np.ndarray
             Predicted 2D coordinates of the object.
         """
         predicted_measurements = np.zeros_like(measurements)
@@ -110,3 +147,194 @@ class AlphaBetaFilter2D:
             predicted_measurements[i] = self(measurement)
 
         return predicted_measurements
+
+    def predict_batch(
+        self,
+        measurements: np.ndarray,
+        as_float: bool = False,
+        block_size: int = 65536,
+    ) -> np.ndarray:
+        """Predicts the 2D coordinates of one or many objects without a Python loop over time.
+
+        The filter is a linear recurrence whose update depends only on whether each measurement
+        is missing, so every step is an affine map of the state and the whole trajectory is
+        computed as a vectorized prefix composition of those maps. Time is processed in blocks
+        of block_size samples, carrying the state between blocks, to bound memory use.
+
+        Parameters
+        ----------
+        measurements : np.ndarray
+            Array of shape (T, 2) or (N, T, 2) of 2D coordinates, with MISSING_VALUE for missing components.
+            Every trajectory starts from the current state of the filter.
+        as_float : bool, optional
+            Whether to return the corrected coordinates as floats instead of truncating them like predict, by default False
+        block_size : int, optional
+            Number of time steps processed at once, by default 65536
+
+        Returns
+        -------
+        predicted_measurements : np.ndarray
+            Array with the same shape as measurements of the predicted 2D coordinates.
+            For a single (T, 2) trajectory the filter state is advanced to the end of it, like predict.
+        """
+        measurements = np.asarray(measurements)
+        single = measurements.ndim == 2
+        # Shape (N, 2, T): one recurrence per trajectory and axis
+        z = np.moveaxis(measurements[None] if single else measurements, 1, 2)
+        z = z.astype(np.float64)
+        observed = z != MISSING_VALUE
+
+        alpha, beta, dt = self.alpha, self.beta, self.dt
+        x = np.broadcast_to(np.array([self.x_k, self.y_k]), z.shape[:2]).copy()
+        v = np.broadcast_to(np.array([self.v_x_k, self.v_y_k]), z.shape[:2]).copy()
+
+        corrected = np.empty_like(z)
+        for start in range(0, z.shape[-1], block_size):
+            z_block = z[..., start : start + block_size]
+            obs = observed[..., start : start + block_size]
+            # Predict then correct when observed, otherwise only predict
+            a, b, c, d, e, f = _compose_affine_scan(
+                (
+                    np.where(obs, 1.0 - alpha, 1.0),
+                    np.where(obs, (1.0 - alpha) * dt, dt),
+                    np.where(obs, -beta / dt, 0.0),
+                    np.where(obs, 1.0 - beta, 1.0),
+                    np.where(obs, alpha * z_block, 0.0),
+                    np.where(obs, beta * z_block / dt, 0.0),
+                )
+            )
+            x_block = a * x[..., None] + b * v[..., None] + e
+            v_block = c * x[..., None] + d * v[..., None] + f
+            corrected[..., start : start + block_size] = x_block
+            x, v = x_block[..., -1], v_block[..., -1]
+
+        if single and z.shape[-1] > 0:
+            (self.x_k, self.y_k), (self.v_x_k, self.v_y_k) = x[0], v[0]
+
+        predicted_measurements = np.moveaxis(corrected, 1, 2)
+        if single:
+            predicted_measurements = predicted_measurements[0]
+        if as_float:
+            return predicted_measurements
+        return np.trunc(predicted_measurements).astype(measurements.dtype)
+
+
+class AlphaBetaFilterBank2D:
+    def __init__(
+        self,
+        alpha: float,
+        beta: float,
+        dt: float = 1.0,
+        capacity: int = 16,
+    ) -> None:
+        """Initializes a bank of independent alpha-beta filters for 2D coordinates stored as contiguous arrays.
+
+        Parameters
+        ----------
+        alpha : float
+            Alpha parameter shared by every filter in the bank.
+        beta : float
+            Beta parameter shared by every filter in the bank.
+        dt : float, optional
+            Time step between frames (seconds), by default 1.0
+        capacity : int, optional
+            Initial number of filters the bank can hold before growing, by default 16
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.dt = dt
+        self.size = 0
+        self._positions = np.zeros((capacity, 2))
+        self._velocities = np.zeros((capacity, 2))
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Array of shape (N, 2) of the (x, y) state of each filter."""
+        return self._positions[: self.size]
+
+    @property
+    def velocities(self) -> np.ndarray:
+        """Array of shape (N, 2) of the (v_x, v_y) state of each filter."""
+        return self._velocities[: self.size]
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._positions)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_positions", "_velocities"):
+            grown = np.zeros((capacity, 2))
+            grown[: self.size] = getattr(self, name)[: self.size]
+            setattr(self, name, grown)
+
+    def add(self, positions: np.ndarray, velocities: np.ndarray) -> np.ndarray:
+        """Appends new filters to the bank.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            Array of shape (K, 2) of initial (x, y) positions.
+        velocities : np.ndarray
+            Array of shape (K, 2) of initial (v_x, v_y) velocities.
+
+        Returns
+        -------
+        index : np.ndarray
+            Indices of the new filters in the bank.
+        """
+        k = len(positions)
+        self._reserve(self.size + k)
+        self._positions[self.size : self.size + k] = positions
+        self._velocities[self.size : self.size + k] = velocities
+        index = np.arange(self.size, self.size + k)
+        self.size += k
+        return index
+
+    def compact(self, keep: np.ndarray) -> None:
+        """Removes filters in place, preserving the order of the remaining ones.
+
+        Parameters
+        ----------
+        keep : np.ndarray
+            Boolean mask of shape (N,) of the filters to keep.
+        """
+        k = int(np.count_nonzero(keep))
+        self._positions[:k] = self.positions[keep]
+        self._velocities[:k] = self.velocities[keep]
+        self.size = k
+
+    def __call__(self, measurements: np.ndarray, index: np.ndarray) -> np.ndarray:
+        """Predicts and corrects the selected filters in one vectorized step.
+
+        Parameters
+        ----------
+        measurements : np.ndarray
+            Array of shape (K, 2) of 2D coordinates. Components equal to MISSING_VALUE only run the prediction step.
+        index : np.ndarray
+            Indices of the K filters to step.
+
+        Returns
+        -------
+        corrected_measurements : np.ndarray
+            Array of shape (K, 2) of the corrected 2D coordinates.
+        """
+        measurements = np.asarray(measurements, dtype=np.float64)
+        x_k = self._positions[index]
+        v_k = self._velocities[index]
+
+        # Calculate the predicted state
+        x_k = x_k + self.dt * v_k
+
+        # Update the state where the measurement is not missing
+        e_k = np.where(measurements != MISSING_VALUE, measurements - x_k, 0.0)
+        x_k += self.alpha * e_k
+        v_k += (self.beta * e_k) / self.dt
+
+        self._positions[index] = x_k
+        self._velocities[index] = v_k
+
+        return x_k
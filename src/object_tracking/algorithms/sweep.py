@@ -0,0 +1,277 @@
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+import numpy as np
+from object_tracking.algorithms.evaluation import evaluate
+from object_tracking.algorithms.object_detection import BoundingBoxMatcher
+from object_tracking.utils.io.columnar import FrameDetections
+
+# Detections and ground truth of the sweep, memory-mapped once by each worker
+_shared: Dict[str, FrameDetections] = {}
+
+
+def parameter_grid(grid: Mapping[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Returns every combination of the values of each parameter.
+
+    Parameters
+    ----------
+    grid : Mapping[str, Sequence[Any]]
+        Values of each parameter, e.g. {"alpha": [0.1, 0.25], "max_frame_skipped": [15, 30]}.
+
+    Returns
+    -------
+    points : List[Dict[str, Any]]
+        Keyword arguments of BoundingBoxMatcher of each combination.
+    """
+    names = list(grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def random_parameters(
+    space: Mapping[str, Any], num_samples: int, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Draws random combinations of parameters, the same ones for the same seed.
+
+    Parameters
+    ----------
+    space : Mapping[str, Any]
+        Distribution of each parameter, one of
+        [low, high] for uniform values, integers if both bounds are,
+        {"log": [low, high]} for log-uniform values,
+        {"choices": [...]} for one of the values,
+        or any other value, which is kept fixed.
+    num_samples : int
+        Number of combinations.
+    seed : int, optional
+        Seed of the random number generator, by default 0
+
+    Returns
+    -------
+    points : List[Dict[str, Any]]
+        Keyword arguments of BoundingBoxMatcher of each combination.
+    """
+    rng = np.random.default_rng(seed)
+    points: List[Dict[str, Any]] = [{} for _ in range(num_samples)]
+    for name, distribution in space.items():
+        if isinstance(distribution, Mapping) and "log" in distribution:
+            low, high = distribution["log"]
+            values = np.exp(rng.uniform(np.log(low), np.log(high), num_samples))
+        elif isinstance(distribution, Mapping) and "choices" in distribution:
+            choices = distribution["choices"]
+            values = [choices[i] for i in rng.integers(len(choices), size=num_samples)]
+        elif (
+            isinstance(distribution, (list, tuple))
+            and len(distribution) == 2
+            and all(isinstance(bound, (int, float)) for bound in distribution)
+        ):
+            low, high = distribution
+            if isinstance(low, int) and isinstance(high, int):
+                values = rng.integers(low, high, size=num_samples, endpoint=True)
+            else:
+                values = rng.uniform(low, high, num_samples)
+        else:
+            values = [distribution] * num_samples
+        for point, value in zip(points, values):
+            point[name] = value.item() if isinstance(value, np.generic) else value
+    return points
+
+
+def point_key(params: Mapping[str, Any]) -> str:
+    """Canonical JSON of a parameter combination, identifying its result in a results file."""
+    return json.dumps(params, sort_keys=True)
+
+
+def run_key(
+    detections: FrameDetections,
+    ground_truth: FrameDetections,
+    fps: int,
+    iou_threshold: float,
+) -> str:
+    """Hash of the data and settings of a sweep, identifying its results in a results file."""
+    digest = hashlib.sha1(json.dumps([fps, iou_threshold]).encode())
+    for data in (detections, ground_truth):
+        for array in (data.offsets, data.boxes, data.ids):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _repair(path: Path) -> None:
+    # A run killed while appending leaves a torn last line, which the next result must not extend
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb+") as file:
+        file.seek(-1, os.SEEK_END)
+        if file.read(1) == b"\n":
+            return
+        file.seek(0)
+        file.truncate(file.read().rfind(b"\n") + 1)
+
+
+def load_results(results_path: str) -> List[Dict[str, Any]]:
+    """Loads the results of a sweep, ignoring a last line that was not completely written."""
+    path = Path(results_path)
+    if not path.exists():
+        return []
+    results = []
+    with open(path, "r") as file:
+        for line in file:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                continue
+    return results
+
+
+def rank_results(
+    results: Sequence[Dict[str, Any]], metric: str = "IDF1"
+) -> List[Dict[str, Any]]:
+    """Sorts results from the best to the worst metric, breaking ties by frames per second."""
+    return sorted(results, key=lambda result: (-result[metric], -result["fps"]))
+
+
+def _load_shared(detections_path: str, ground_truth_path: str) -> None:
+    _shared["detections"] = FrameDetections.load(detections_path)
+    _shared["ground_truth"] = FrameDetections.load(ground_truth_path)
+
+
+def _run_point(
+    params: Dict[str, Any], fps: int, iou_threshold: float
+) -> Dict[str, Any]:
+    detections = _shared["detections"]
+    matcher_kwargs = {
+        "max_distance_threshold": 0.2,
+        "max_frame_skipped": fps,
+        "fps": fps,
+        **params,
+    }
+    # Tracking the first frames loads what the run uses lazily, so it is not timed
+    warm_up = FrameDetections(
+        detections.offsets[:3],
+        detections.boxes[: detections.offsets[min(2, len(detections))]],
+    )
+    BoundingBoxMatcher(None, **matcher_kwargs).fit_columnar(warm_up)
+    start = time.perf_counter()
+    tracked = BoundingBoxMatcher(None, **matcher_kwargs).fit_columnar(detections)
+    seconds = time.perf_counter() - start
+    metrics = evaluate(tracked, _shared["ground_truth"], iou_threshold=iou_threshold)
+    return {
+        "params": params,
+        **metrics,
+        "seconds": seconds,
+        "fps": len(detections) / seconds if seconds > 0 else float("inf"),
+    }
+
+
+def sweep(
+    detections: FrameDetections,
+    ground_truth: FrameDetections,
+    points: Sequence[Dict[str, Any]],
+    results_path: str,
+    workers: Optional[int] = None,
+    fps: int = 30,
+    iou_threshold: float = 0.5,
+    metric: str = "IDF1",
+) -> List[Dict[str, Any]]:
+    """Tracks detections with every parameter combination in parallel and ranks them against the ground truth.
+
+    The detections and the ground truth are written once as .npy files next to the results, in
+    results_path with the suffix ".data", and every worker process memory-maps them read-only,
+    so the pages are shared instead of copied or parsed per run. Each finished run is appended
+    as one JSON line to results_path, with its parameters, the metrics of evaluate, its tracking
+    time and frames per second, keyed by run_key of the data and settings. Combinations already in
+    results_path with the same key are not run again, so an interrupted sweep resumes where it
+    stopped when rerun with the same points, while results of other data or settings in the same
+    file are ignored.
+
+    Parameters
+    ----------
+    detections : FrameDetections
+        Bounding boxes of each frame.
+    ground_truth : FrameDetections
+        True bounding boxes of each frame with their object identifiers.
+    points : Sequence[Dict[str, Any]]
+        Keyword arguments of BoundingBoxMatcher of each run, e.g. from parameter_grid or random_parameters,
+        by default max_distance_threshold=0.2 and max_frame_skipped=fps.
+    results_path : str
+        JSONL file the results are appended to.
+    workers : Optional[int], optional
+        Number of worker processes, by default the number of CPUs. With 1 the runs happen in this process.
+    fps : int, optional
+        Frames per second of the video, by default 30
+    iou_threshold : float, optional
+        Smallest IoU of a match, see evaluate, by default 0.5
+    metric : str, optional
+        Metric of evaluate the results are ranked by, by default "IDF1"
+
+    Returns
+    -------
+    results : List[Dict[str, Any]]
+        Results of all the points with these data and settings, also those of earlier runs, from
+        the best to the worst.
+    """
+    path = Path(results_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data_path = path.with_suffix(".data")
+    detections_path = str(data_path / "detections")
+    ground_truth_path = str(data_path / "ground_truth")
+    detections.save(detections_path)
+    ground_truth.save(ground_truth_path)
+
+    key = run_key(detections, ground_truth, fps, iou_threshold)
+    wanted = {point_key(point) for point in points}
+    done = {
+        point_key(result["params"]): result
+        for result in load_results(results_path)
+        if result.get("run") == key and point_key(result["params"]) in wanted
+    }
+    pending = list(
+        {
+            point_key(point): point for point in points if point_key(point) not in done
+        }.values()
+    )
+
+    _repair(path)
+    with open(path, "a") as file:
+
+        def record(result: Dict[str, Any]) -> None:
+            result = {"run": key, **result}
+            file.write(json.dumps(result) + "\n")
+            file.flush()
+            done[point_key(result["params"])] = result
+
+        def failed(point: Dict[str, Any], error: Exception) -> None:
+            print(f"{point_key(point)} failed: {error!r}", file=sys.stderr)
+
+        if workers == 1:
+            _load_shared(detections_path, ground_truth_path)
+            for point in pending:
+                try:
+                    record(_run_point(point, fps, iou_threshold))
+                except Exception as error:
+                    failed(point, error)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_load_shared,
+                initargs=(detections_path, ground_truth_path),
+            ) as executor:
+                futures = {
+                    executor.submit(_run_point, point, fps, iou_threshold): point
+                    for point in pending
+                }
+                for future in as_completed(futures):
+                    try:
+                        record(future.result())
+                    except Exception as error:
+                        failed(futures[future], error)
+
+    return rank_results(list(done.values()), metric)
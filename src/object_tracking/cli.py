@@ -0,0 +1,452 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from object_tracking import MISSING_VALUE
+from object_tracking.algorithms.chunking import fit_chunked
+from object_tracking.algorithms.evaluation import evaluate
+from object_tracking.algorithms.object_detection import BoundingBoxMatcher
+from object_tracking.algorithms.object_tracking import AlphaBetaFilter2D
+from object_tracking.algorithms.sweep import parameter_grid, random_parameters, sweep
+from object_tracking.utils.io import load_obj_each_frame
+from object_tracking.utils.io.columnar import FrameDetections
+from object_tracking.utils.io.object_detection import (
+    iter_bounding_boxes,
+    save_bounding_boxes,
+    save_bounding_boxes_stream,
+)
+from object_tracking.utils.io.object_tracking import save_target_object_centers
+
+# Keys of a job that name files, resolved relative to the manifest
+PATH_KEYS = ("video", "detections", "output", "render")
+
+JOB_DEFAULTS: Dict[str, Any] = {
+    "mode": "mot",
+    "width": 700,
+    "height": 500,
+    "fps": 30,
+    "codec": "avc1",
+    "backend": "opencv",
+}
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """Loads the jobs of a manifest.
+
+    The manifest is a JSON list of jobs, a JSON object {"defaults": {...}, "jobs": [...]}
+    or a JSONL file with one job per line. Each job has the keys
+
+    - "detections": detections as frame_dict .json, .jsonl, .npz or a columnar directory for "mot",
+      or an object_to_track.json with the "obj" centers for "sot"
+    - "output": path of the tracked detections, in any of the same formats, or of the filtered centers
+    - "mode" (optional): "mot" for multi-object or "sot" for single object tracking, by default "mot"
+    - "video" and "render" (optional): source video and path of the annotated video
+    - "preview" (optional): keyword arguments of a Preview, e.g. {"stride": 10, "scale": 0.5},
+      to render only part of the video
+    - "params" (optional): keyword arguments of BoundingBoxMatcher or AlphaBetaFilter2D
+    - "chunk_size", "overlap" and "chunk_workers" (optional): track a long "mot" recording in
+      overlapping chunks across processes with fit_chunked
+    - "name", "width", "height", "fps", "codec", "backend" (optional)
+
+    Relative paths are resolved relative to the manifest.
+    """
+    path = Path(manifest_path)
+    with open(path, "r") as file:
+        if path.suffix == ".jsonl":
+            data: Any = [json.loads(line) for line in file if line.strip()]
+        else:
+            data = json.load(file)
+    defaults, jobs = (
+        ({}, data)
+        if isinstance(data, list)
+        else (data.get("defaults", {}), data["jobs"])
+    )
+
+    resolved = []
+    for index, job in enumerate(jobs):
+        params = {**defaults.get("params", {}), **job.get("params", {})}
+        job = {**JOB_DEFAULTS, **defaults, **job, "params": params}
+        if "detections" not in job or "output" not in job:
+            raise ValueError(
+                f"Job {index} of {manifest_path} needs 'detections' and 'output'"
+            )
+        if job["mode"] not in ("mot", "sot"):
+            raise ValueError(
+                f"Job {index} of {manifest_path} has unknown mode '{job['mode']}'"
+            )
+        if job.get("render") and not job.get("video"):
+            raise ValueError(
+                f"Job {index} of {manifest_path} renders without a 'video'"
+            )
+        for key in PATH_KEYS:
+            if job.get(key):
+                job[key] = str(path.parent / job[key])
+        job.setdefault("name", Path(job["output"]).stem)
+        resolved.append(job)
+    return resolved
+
+
+def _mtime(path: str) -> float:
+    """Returns the modification time of a file, or the latest of the files of a directory."""
+    if os.path.isdir(path):
+        return max(
+            (entry.stat().st_mtime for entry in os.scandir(path)),
+            default=os.path.getmtime(path),
+        )
+    return os.path.getmtime(path)
+
+
+def job_digest(job: Dict[str, Any]) -> str:
+    """Hash of the settings of a job, everything but its name, which its outputs depend on."""
+    settings = {key: value for key, value in job.items() if key != "name"}
+    return hashlib.sha1(
+        json.dumps(settings, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _digest_path(job: Dict[str, Any]) -> str:
+    # Written next to the output once all the outputs of the job are
+    return job["output"] + ".job"
+
+
+def is_up_to_date(job: Dict[str, Any]) -> bool:
+    """Whether every output of a job exists, is newer than its inputs and was made with its settings."""
+    inputs = [job["detections"]]
+    outputs = [job["output"]]
+    if job.get("render"):
+        inputs.append(job["video"])
+        outputs.append(job["render"])
+    if not all(os.path.exists(path) for path in outputs):
+        return False
+    try:
+        with open(_digest_path(job), "r") as file:
+            if file.read().strip() != job_digest(job):
+                return False
+    except FileNotFoundError:
+        return False
+    return min(map(_mtime, outputs)) >= max(map(_mtime, inputs))
+
+
+def load_detections(data_path: str) -> FrameDetections:
+    """Loads detections from a frame_dict .json, a .jsonl, a .npz or a columnar directory."""
+    if data_path.endswith(".json"):
+        return FrameDetections.from_frame_dict(load_obj_each_frame(data_path))
+    if data_path.endswith(".jsonl"):
+        frames = iter_bounding_boxes(data_path)
+        return FrameDetections.from_frame_dict(
+            {str(f): dets for f, dets in enumerate(frames)}
+        )
+    return FrameDetections.load(data_path)
+
+
+def save_detections(detections: FrameDetections, save_path: str) -> None:
+    """Saves detections to a frame_dict .json, a .jsonl, a .npz or a columnar directory."""
+    if save_path.endswith(".json"):
+        save_bounding_boxes(detections.to_frame_dict(), save_path)
+    elif save_path.endswith(".jsonl"):
+        frame_dict = detections.to_frame_dict()
+        save_bounding_boxes_stream(
+            (frame_dict[str(f)] for f in range(len(detections))), save_path
+        )
+    else:
+        detections.save(save_path)
+
+
+def _run_mot(job: Dict[str, Any]) -> Dict[str, int]:
+    params = {
+        "max_distance_threshold": 0.2,
+        "max_frame_skipped": job["fps"],
+        **job["params"],
+    }
+    detections = load_detections(job["detections"])
+    if job.get("chunk_size"):
+        tracked = fit_chunked(
+            detections,
+            chunk_size=job["chunk_size"],
+            overlap=job.get("overlap", 30),
+            workers=job.get("chunk_workers"),
+            fps=job["fps"],
+            **params,
+        )
+    else:
+        tracked = BoundingBoxMatcher(None, fps=job["fps"], **params).fit_columnar(
+            detections
+        )
+    save_detections(tracked, job["output"])
+
+    if job.get("render"):
+        # Drawing loads OpenCV, which jobs without a render do not pay for
+        from object_tracking.utils.draw.object_detection import (
+            draw_bounding_boxes_in_video,
+        )
+        from object_tracking.utils.video import Preview
+
+        draw_bounding_boxes_in_video(
+            width=job["width"],
+            height=job["height"],
+            bounding_boxes=tracked.to_frame_dict(),
+            source_video=job["video"],
+            save_path=job["render"],
+            codec=job["codec"],
+            fps=job["fps"],
+            backend=job["backend"],
+            preview=Preview(**job["preview"]) if job.get("preview") else None,
+        )
+    return {"frames": len(tracked), "detections": len(tracked.boxes)}
+
+
+def _run_sot(job: Dict[str, Any]) -> Dict[str, int]:
+    coords = np.array(load_obj_each_frame(job["detections"])["obj"]).reshape(-1, 2)
+    params = {"alpha": 0.25, "beta": 0.0025, "dt": 1.0 / job["fps"], **job["params"]}
+    if "x_0" not in params or "y_0" not in params:
+        # Start at the first measurement unless an initial position is given
+        observed = coords[(coords != MISSING_VALUE).all(axis=1)]
+        x_0, y_0 = observed[0] if len(observed) else (0, 0)
+        params = {"x_0": int(x_0), "y_0": int(y_0), **params}
+    centers = AlphaBetaFilter2D(**params).predict_batch(coords)
+    save_target_object_centers(centers.tolist(), job["output"])
+
+    if job.get("render"):
+        from object_tracking.utils.draw.object_tracking import (
+            draw_target_object_tracks,
+        )
+        from object_tracking.utils.video import Preview
+
+        draw_target_object_tracks(
+            width=job["width"],
+            height=job["height"],
+            object_centers=centers,
+            source_video=job["video"],
+            save_path=job["render"],
+            codec=job["codec"],
+            fps=job["fps"],
+            backend=job["backend"],
+            preview=Preview(**job["preview"]) if job.get("preview") else None,
+        )
+    return {"frames": len(centers), "detections": len(centers)}
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs the tracking and optional rendering of one job, returning its name, size and duration."""
+    start = time.perf_counter()
+    counts = _run_mot(job) if job["mode"] == "mot" else _run_sot(job)
+    with open(_digest_path(job), "w") as file:
+        file.write(job_digest(job) + "\n")
+    return {"name": job["name"], **counts, "seconds": time.perf_counter() - start}
+
+
+def run(manifest_path: str, workers: Optional[int] = None, force: bool = False) -> int:
+    """Runs the jobs of a manifest across a process pool and prints the aggregate throughput.
+
+    Returns the number of failed jobs.
+    """
+    jobs = load_manifest(manifest_path)
+    pending = [job for job in jobs if force or not is_up_to_date(job)]
+    print(
+        f"{len(jobs)} jobs, {len(jobs) - len(pending)} up to date, {len(pending)} to run"
+    )
+
+    frames = detections = failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, job): job for job in pending}
+        for count, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]["name"]
+            try:
+                result = future.result()
+            except Exception as error:
+                failed += 1
+                print(
+                    f"[{count}/{len(pending)}] {name} failed: {error!r}",
+                    file=sys.stderr,
+                )
+                continue
+            frames += result["frames"]
+            detections += result["detections"]
+            job_fps = (
+                result["frames"] / result["seconds"]
+                if result["seconds"] > 0
+                else float("inf")
+            )
+            print(
+                f"[{count}/{len(pending)}] {name}: {result['frames']} frames in {result['seconds']:.2f}s ({job_fps:.1f} fps)"
+            )
+    elapsed = time.perf_counter() - start
+
+    seconds = max(elapsed, 1e-9)
+    print(
+        f"{len(pending) - failed} jobs done, {failed} failed in {elapsed:.2f}s: "
+        f"{frames} frames ({frames / seconds:.1f} fps), "
+        f"{detections} detections ({detections / seconds:.1f}/s)"
+    )
+    return failed
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="object-tracking",
+        description="Single and multi-object tracking of many videos and detection files.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser(
+        "run", help="run the jobs of a manifest in parallel"
+    )
+    run_parser.add_argument("manifest", help="JSON or JSONL manifest of jobs")
+    run_parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes, by default the number of CPUs",
+    )
+    run_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="also run jobs whose outputs are up to date",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="track live streams of newline-delimited JSON detections over a socket",
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument(
+        "--unix", help="path of a Unix socket to listen on instead of TCP"
+    )
+    serve_parser.add_argument(
+        "--params",
+        type=json.loads,
+        default={},
+        help="JSON object of BoundingBoxMatcher keyword arguments for every stream",
+    )
+    serve_parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="frames of a stream that can wait to be tracked before its sender is held back",
+    )
+    serve_parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of threads running trackers",
+    )
+    serve_parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="time budget of each frame, over which streams fall back to cheaper association",
+    )
+
+    evaluate_parser = subparsers.add_parser(
+        "evaluate",
+        help="score tracked detections against ground truth (MOTA, IDF1, HOTA)",
+    )
+    evaluate_parser.add_argument(
+        "tracked", help="tracked detections in any detections format"
+    )
+    evaluate_parser.add_argument(
+        "ground_truth", help="ground truth boxes with object ids, in the same formats"
+    )
+    evaluate_parser.add_argument("--iou-threshold", type=float, default=0.5)
+
+    sweep_parser = subparsers.add_parser(
+        "sweep",
+        help="rank BoundingBoxMatcher parameters by tracking accuracy and speed against ground truth",
+    )
+    sweep_parser.add_argument("detections", help="detections in any detections format")
+    sweep_parser.add_argument(
+        "ground_truth", help="ground truth boxes with object ids, in the same formats"
+    )
+    space = sweep_parser.add_mutually_exclusive_group(required=True)
+    space.add_argument(
+        "--grid",
+        type=json.loads,
+        help='JSON object of the values of each parameter, e.g. {"alpha": [0.1, 0.25]}',
+    )
+    space.add_argument(
+        "--random",
+        type=json.loads,
+        help='JSON object of the distribution of each parameter, e.g. {"beta": {"log": [1e-4, 1e-1]}}',
+    )
+    sweep_parser.add_argument(
+        "--samples", type=int, default=50, help="number of random combinations"
+    )
+    sweep_parser.add_argument("--seed", type=int, default=0)
+    sweep_parser.add_argument(
+        "-o",
+        "--output",
+        default="sweep.jsonl",
+        help="JSONL results, resumed from if it exists",
+    )
+    sweep_parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes, by default the number of CPUs",
+    )
+    sweep_parser.add_argument("--fps", type=int, default=30)
+    sweep_parser.add_argument("--iou-threshold", type=float, default=0.5)
+    sweep_parser.add_argument("--metric", default="IDF1")
+    sweep_parser.add_argument(
+        "--top", type=int, default=10, help="number of best results to print"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return 1 if run(args.manifest, args.workers, args.force) else 0
+    if args.command == "evaluate":
+        metrics = evaluate(
+            load_detections(args.tracked),
+            load_detections(args.ground_truth),
+            iou_threshold=args.iou_threshold,
+        )
+        print(json.dumps(metrics, indent=2))
+    if args.command == "sweep":
+        points = (
+            parameter_grid(args.grid)
+            if args.grid is not None
+            else random_parameters(args.random, args.samples, args.seed)
+        )
+        results = sweep(
+            load_detections(args.detections),
+            load_detections(args.ground_truth),
+            points,
+            args.output,
+            workers=args.workers,
+            fps=args.fps,
+            iou_threshold=args.iou_threshold,
+            metric=args.metric,
+        )
+        for result in results[: args.top]:
+            print(
+                f"{args.metric} {result[args.metric]:.4f}  MOTA {result['MOTA']:.4f}  "
+                f"{result['fps']:.1f} fps  {json.dumps(result['params'])}"
+            )
+    if args.command == "serve":
+        from object_tracking.service import serve
+
+        serve(
+            args.host,
+            args.port,
+            args.unix,
+            args.params,
+            args.queue_size,
+            args.workers,
+            args.budget_ms,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
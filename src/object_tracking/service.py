@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from object_tracking.algorithms.budget import LatencyBudget
+from object_tracking.algorithms.object_detection import BoundingBoxMatcher
+
+
+class StreamWorker:
+    def __init__(
+        self,
+        stream: str,
+        matcher: BoundingBoxMatcher,
+        queue_size: int,
+        executor: ThreadPoolExecutor,
+    ) -> None:
+        """Tracks the frames of one stream in order, one frame at a time.
+
+        Parameters
+        ----------
+        stream : str
+            Identifier of the stream.
+        matcher : BoundingBoxMatcher
+            Tracker of the stream.
+        queue_size : int
+            Number of frames that can wait for the tracker before senders are held back.
+        executor : ThreadPoolExecutor
+            Threads the tracker runs in, so the event loop keeps serving the other streams.
+        """
+        self.stream = stream
+        self.matcher = matcher
+        self.executor = executor
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.frames = 0
+        self.task = asyncio.create_task(self._run())
+
+    def _update(self, detections: List[Dict[str, int]]) -> List[int]:
+        self.matcher.update(detections)
+        return [det["id"] for det in detections]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message, received, connection = await self.queue.get()
+            try:
+                ids = await loop.run_in_executor(
+                    self.executor, self._update, message["detections"]
+                )
+                reply: Dict[str, Any] = {
+                    "stream": self.stream,
+                    "frame": message.get("frame", self.frames),
+                    "ids": ids,
+                    "latency_ms": (time.perf_counter() - received) * 1e3,
+                }
+                if self.matcher.budget is not None:
+                    reply["path"] = self.matcher.budget.path
+            except Exception as error:
+                reply = {"stream": self.stream, "error": repr(error)}
+            self.frames += 1
+            await connection.send(reply)
+            self.queue.task_done()
+
+    async def close(self) -> None:
+        """Tracks the frames already queued and stops."""
+        await self.queue.join()
+        self.task.cancel()
+
+
+class Connection:
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.lock = asyncio.Lock()
+
+    async def send(self, reply: Dict[str, Any]) -> None:
+        """Writes one reply line, waiting while the client reads slower than replies are written."""
+        if self.writer.is_closing():
+            return
+        async with self.lock:
+            self.writer.write(json.dumps(reply).encode() + b"\n")
+            try:
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+
+
+class TrackingService:
+    def __init__(
+        self,
+        matcher_params: Optional[Dict[str, Any]] = None,
+        queue_size: int = 64,
+        workers: Optional[int] = None,
+        budget_ms: Optional[float] = None,
+    ) -> None:
+        """Tracks detections of many live streams received as newline-delimited JSON.
+
+        Every line sent by a client is a frame {"stream": ..., "frame": ..., "detections": [...]}, where
+        "frame" is optional and each detection has x_min, y_min, width and height. Each stream is tracked
+        in order by its own BoundingBoxMatcher, created on its first frame, and every frame is answered on
+        the same connection with {"stream": ..., "frame": ..., "ids": [...], "latency_ms": ...}, the ids
+        in the order of the detections, and with budget_ms the association "path" of the frame, see
+        LatencyBudget. {"stream": ..., "close": true} ends a stream after its queued frames. Replies of
+        different streams may arrive in any order.
+
+        A connection stops being read while the queue of the stream of its next frame is full, and
+        replies wait for the client to read them, so fast senders are held back instead of growing memory.
+
+        Parameters
+        ----------
+        matcher_params : Optional[Dict[str, Any]], optional
+            Keyword arguments of the BoundingBoxMatcher of each stream,
+            by default max_distance_threshold=0.2, max_frame_skipped=30 and fps=30
+        queue_size : int, optional
+            Number of frames of a stream that can wait to be tracked, by default 64
+        workers : Optional[int], optional
+            Number of threads running trackers, by default that of ThreadPoolExecutor
+        budget_ms : Optional[float], optional
+            Time budget of each frame (milliseconds), which makes every stream fall back to cheaper
+            association when a frame would overrun it, by default None
+        """
+        self.matcher_params = {
+            "max_distance_threshold": 0.2,
+            "max_frame_skipped": 30,
+            "fps": 30,
+            **(matcher_params or {}),
+        }
+        self.queue_size = queue_size
+        self.budget_ms = budget_ms
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.streams: Dict[str, StreamWorker] = {}
+
+    def _worker(self, stream: str) -> StreamWorker:
+        if stream not in self.streams:
+            budget = None
+            if self.budget_ms is not None:
+                budget = LatencyBudget(self.budget_ms / 1e3)
+            self.streams[stream] = StreamWorker(
+                stream,
+                BoundingBoxMatcher(None, **self.matcher_params, budget=budget),
+                self.queue_size,
+                self.executor,
+            )
+        return self.streams[stream]
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves one client connection until it closes."""
+        connection = Connection(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                received = time.perf_counter()
+                try:
+                    message = json.loads(line)
+                    stream = str(message["stream"])
+                except (ValueError, KeyError, TypeError) as error:
+                    await connection.send({"error": f"invalid message: {error!r}"})
+                    continue
+
+                if message.get("close"):
+                    worker = self.streams.pop(stream, None)
+                    if worker is not None:
+                        await worker.close()
+                    await connection.send({"stream": stream, "closed": True})
+                    continue
+                if not isinstance(message.get("detections"), list):
+                    await connection.send(
+                        {"stream": stream, "error": "missing 'detections' list"}
+                    )
+                    continue
+                # Waits while the stream is behind, which stops reading from this connection
+                await self._worker(stream).queue.put((message, received, connection))
+        finally:
+            writer.close()
+
+    async def serve(
+        self,
+        host: Optional[str] = "127.0.0.1",
+        port: Optional[int] = 8765,
+        path: Optional[str] = None,
+    ) -> None:
+        """Serves clients over TCP, or over a Unix socket if path is given, until cancelled."""
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Tracks the frames already queued of every stream and stops the trackers."""
+        for worker in list(self.streams.values()):
+            await worker.close()
+        self.streams.clear()
+        self.executor.shutdown(wait=False)
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    path: Optional[str] = None,
+    matcher_params: Optional[Dict[str, Any]] = None,
+    queue_size: int = 64,
+    workers: Optional[int] = None,
+    budget_ms: Optional[float] = None,
+) -> None:
+    """Runs a TrackingService until interrupted."""
+    service = TrackingService(matcher_params, queue_size, workers, budget_ms)
+    try:
+        asyncio.run(service.serve(host, port, path))
+    except KeyboardInterrupt:
+        pass
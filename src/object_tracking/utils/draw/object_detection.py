@@ -1,7 +1,18 @@
-from pathlib import Path
 import cv2
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import cv2.typing
+import numpy as np
+from object_tracking import MISSING_VALUE
+from object_tracking.algorithms.object_detection import detections_to_array
+from object_tracking.utils.draw.object_tracking import TrackTrails
+from object_tracking.utils.video import (
+    RenderStats,
+    FrameCache,
+    Preview,
+    frame_source,
+    make_video_writer,
+    render_video,
+)
 
 
 def draw_bounding_box(
@@ -46,32 +57,156 @@ def annotate_bounding_box(
     return image
 
 
+def draw_bounding_boxes(
+    image: cv2.typing.MatLike,
+    boxes: np.ndarray,
+    color: Tuple[int, int, int] = (0, 255, 0),
+    thickness: int = 2,
+) -> cv2.typing.MatLike:
+    """Draws every bounding box of a frame in one call, the same pixels as draw_bounding_box for each.
+
+    Parameters
+    ----------
+    image : cv2.typing.MatLike
+        Frame to draw on.
+    boxes : np.ndarray
+        Array of shape (N, 4) of bounding boxes as (x_min, y_min, width, height).
+    color : Tuple[int, int, int], optional
+        BGR color of the boxes, by default (0, 255, 0)
+    thickness : int, optional
+        Thickness of the boxes, by default 2
+
+    Returns
+    -------
+    image : cv2.typing.MatLike
+        Frame with the boxes.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4).astype(np.int32)
+    if len(boxes) == 0:
+        return image
+    x_min, y_min = boxes[:, 0], boxes[:, 1]
+    x_max, y_max = x_min + boxes[:, 2], y_min + boxes[:, 3]
+    # cv2.rectangle draws the same closed polyline through the four corners
+    corners = np.stack(
+        [x_min, y_min, x_max, y_min, x_max, y_max, x_min, y_max], axis=1
+    ).reshape(-1, 4, 2)
+    return cv2.polylines(image, corners, True, color, thickness)
+
+
+def annotate_bounding_boxes(
+    image: cv2.typing.MatLike,
+    boxes: np.ndarray,
+    ids: Sequence[int],
+    color: Tuple[int, int, int] = (255, 0, 0),
+) -> cv2.typing.MatLike:
+    """Writes the track identifier of every bounding box of a frame at its center, as annotate_bounding_box.
+
+    Parameters
+    ----------
+    image : cv2.typing.MatLike
+        Frame to draw on.
+    boxes : np.ndarray
+        Array of shape (N, 4) of bounding boxes as (x_min, y_min, width, height).
+    ids : Sequence[int]
+        Track identifier of each bounding box.
+    color : Tuple[int, int, int], optional
+        BGR color of the labels, by default (255, 0, 0)
+
+    Returns
+    -------
+    image : cv2.typing.MatLike
+        Frame with the labels.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4).astype(np.int64)
+    centers = boxes[:, :2] + boxes[:, 2:] // 2
+    for track_id, center in zip(ids, centers.tolist()):
+        image = cv2.putText(
+            image,
+            str(track_id),
+            tuple(center),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            color,
+            2,
+            cv2.LINE_AA,
+        )
+    return image
+
+
+def preview_bounding_box(
+    bounding_box: Dict[str, int], preview: Preview, width: int, height: int
+) -> Dict[str, int]:
+    """Maps a bounding box of the (width, height) frames to the frames rendered by a preview."""
+    x_min, y_min = preview.point(
+        bounding_box["x_min"], bounding_box["y_min"], width, height
+    )
+    box_width, box_height = preview.length(
+        bounding_box["width"], bounding_box["height"], width, height
+    )
+    return {
+        **bounding_box,
+        "x_min": x_min,
+        "y_min": y_min,
+        "width": box_width,
+        "height": box_height,
+    }
+
+
+def preview_bounding_boxes(
+    boxes: np.ndarray, preview: Preview, width: int, height: int
+) -> np.ndarray:
+    """Maps an (N, 4) array of bounding boxes of the (width, height) frames to the frames rendered by a preview."""
+    x_min, y_min, x_max, y_max = preview.region(width, height)
+    out_width, out_height = preview.size(width, height)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    # The same arithmetic as Preview.point and Preview.length, rounding halves to even like round
+    offset = np.array([x_min, y_min, 0, 0])
+    numerator = np.array([out_width, out_height] * 2)
+    denominator = np.array([x_max - x_min, y_max - y_min] * 2)
+    return np.round((boxes - offset) * numerator / denominator).astype(np.int64)
+
+
 def draw_bounding_boxes_in_video(
     width: int,
     height: int,
     bounding_boxes: Dict[str, List[Dict[str, int]]],
-    source_video: str,
+    source_video: Union[str, FrameCache],
     save_path: str,
     codec: str = "avc1",
     fps: int = 30,
-) -> None:
-    Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-    count = 0
-    cap = cv2.VideoCapture(source_video)
-    ok, image = cap.read()
-    vidwrite = cv2.VideoWriter(
-        save_path,
-        cv2.VideoWriter_fourcc(*codec),  # type: ignore
-        fps,
-        (width, height),
+    backend: str = "opencv",
+    trail_length: int = 0,
+    preview: Optional[Preview] = None,
+) -> RenderStats:
+    out_width, out_height = (
+        (width, height) if preview is None else preview.size(width, height)
+    )
+    trails = (
+        TrackTrails(out_width, out_height, max_length=trail_length)
+        if trail_length
+        else None
+    )
+
+    def draw(count: int, image: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        bboxes = bounding_boxes[str(count if preview is None else preview.frame(count))]
+        # Every box of the frame is drawn from one array instead of one dict at a time
+        boxes = detections_to_array(bboxes).astype(np.int64)
+        ids = [bbox.get("id", MISSING_VALUE) for bbox in bboxes]
+        if preview is not None:
+            boxes = preview_bounding_boxes(boxes, preview, width, height)
+        # Detections left without a track (MISSING_VALUE) get no label or trail
+        labelled = np.array(ids, dtype=np.int64) != MISSING_VALUE
+        ids = [track_id for track_id in ids if track_id != MISSING_VALUE]
+        if trails is not None:
+            centers = boxes[labelled, :2] + boxes[labelled, 2:] // 2
+            for track_id, center in zip(ids, centers.tolist()):
+                trails.add(track_id, center)
+            image = trails.draw(image)
+        image = draw_bounding_boxes(image, boxes)
+        return annotate_bounding_boxes(image, boxes[labelled], ids)
+
+    return render_video(
+        frame_source(source_video, width, height, preview=preview),
+        draw,
+        make_video_writer(save_path, out_width, out_height, fps, codec, backend),
     )
-    while ok:
-        image = cv2.resize(image, (width, height))
-        bboxes = bounding_boxes[str(count)]
-        for bbox in bboxes:
-            image = draw_bounding_box(bbox, image)
-            image = annotate_bounding_box(bbox, image)
-        vidwrite.write(image)
-        count += 1
-        ok, image = cap.read()
-    vidwrite.release()
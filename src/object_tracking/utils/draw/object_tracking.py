@@ -1,11 +1,18 @@
-from pathlib import Path
 import cv2
 import cv2.typing
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
 from object_tracking import MISSING_VALUE
+from object_tracking.utils.video import (
+    RenderStats,
+    FrameCache,
+    Preview,
+    frame_source,
+    make_video_writer,
+    render_video,
+)
 
 
 def draw_target_object_center(
@@ -24,29 +31,31 @@ def draw_target_object_centers(
     width: int,
     height: int,
     object_centers: List[List[int]],
-    source_video: str,
+    source_video: Union[str, FrameCache],
     save_path: str,
     codec: str = "avc1",
     fps: int = 30,
-) -> None:
-    Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-    count = 0
-    cap = cv2.VideoCapture(source_video)
-    ok, image = cap.read()
-    vidwrite = cv2.VideoWriter(
-        save_path,
-        cv2.VideoWriter_fourcc(*codec),  # type: ignore
-        fps,
-        (width, height),
+    backend: str = "opencv",
+    preview: Optional[Preview] = None,
+) -> RenderStats:
+    out_width, out_height = (
+        (width, height) if preview is None else preview.size(width, height)
+    )
+
+    def draw(count: int, image: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        if preview is None:
+            pos_x, pos_y = object_centers[count]
+        else:
+            pos_x, pos_y = preview.point(
+                *object_centers[preview.frame(count)], width, height
+            )
+        return draw_target_object_center(image, pos_x, pos_y)
+
+    return render_video(
+        frame_source(source_video, width, height, preview=preview),
+        draw,
+        make_video_writer(save_path, out_width, out_height, fps, codec, backend),
     )
-    while ok:
-        pos_x, pos_y = object_centers[count]
-        count += 1
-        image = cv2.resize(image, (width, height))
-        image = draw_target_object_center(image, pos_x, pos_y)
-        vidwrite.write(image)
-        ok, image = cap.read()
-    vidwrite.release()
 
 
 def draw_target_object_track(
@@ -58,35 +67,190 @@ def draw_target_object_track(
     return cv2.polylines(image, [coords], False, color, thickness)
 
 
+def track_color(track_id: int) -> Tuple[int, int, int]:
+    """Returns a distinct, stable BGR color for a track identifier."""
+    hue = (track_id * 47) % 180
+    hsv = np.array([[[hue, 255, 255]]], dtype=np.uint8)
+    b, g, r = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0]
+    return int(b), int(g), int(r)
+
+
+class TrackTrails:
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        max_length: Optional[int] = None,
+        thickness: int = 2,
+    ) -> None:
+        """Draws the trail of every track without redrawing whole histories each frame.
+
+        Without max_length, trails are kept on a persistent overlay layer: each new point only
+        draws its newest segment, and the overlay is composited onto the frame. With max_length,
+        each track keeps its last max_length points in a ring buffer and only those are drawn,
+        so memory and draw cost stay bounded; tracks without new points for max_length frames are dropped.
+
+        Parameters
+        ----------
+        width : int
+            Width of the frames.
+        height : int
+            Height of the frames.
+        max_length : Optional[int], optional
+            Number of points kept per trail, by default None (unbounded)
+        thickness : int, optional
+            Thickness of the trails, by default 2
+        """
+        self.max_length = max_length
+        self.thickness = thickness
+        self.frame = 0
+        self.colors: Dict[int, Tuple[int, int, int]] = {}
+        self.last_points: Dict[int, Tuple[int, int]] = {}
+        self.last_seen: Dict[int, int] = {}
+        if max_length is None:
+            self.overlay = np.zeros((height, width, 3), dtype=np.uint8)
+            self.mask = np.zeros((height, width), dtype=np.uint8)
+            # Region of the overlay drawn so far as (x_min, y_min, x_max, y_max)
+            self.dirty: Optional[List[int]] = None
+        else:
+            self.buffers: Dict[int, np.ndarray] = {}
+            self.lengths: Dict[int, int] = {}
+
+    def add(
+        self,
+        track_id: int,
+        point: Tuple[int, int],
+        color: Optional[Tuple[int, int, int]] = None,
+    ) -> None:
+        """Appends a point to the trail of a track.
+
+        Parameters
+        ----------
+        track_id : int
+            Identifier of the track.
+        point : Tuple[int, int]
+            (x, y) coordinates of the point.
+        color : Optional[Tuple[int, int, int]], optional
+            BGR color of the trail, by default track_color(track_id)
+        """
+        point = (int(point[0]), int(point[1]))
+        if track_id not in self.colors:
+            self.colors[track_id] = track_color(track_id) if color is None else color
+        self.last_seen[track_id] = self.frame
+
+        if self.max_length is None:
+            if track_id in self.last_points:
+                self._draw_segment(
+                    self.last_points[track_id], point, self.colors[track_id]
+                )
+        else:
+            if track_id not in self.buffers:
+                self.buffers[track_id] = np.zeros((self.max_length, 2), dtype=np.int32)
+                self.lengths[track_id] = 0
+            self.buffers[track_id][self.lengths[track_id] % self.max_length] = point
+            self.lengths[track_id] += 1
+        self.last_points[track_id] = point
+
+    def _draw_segment(
+        self,
+        start: Tuple[int, int],
+        end: Tuple[int, int],
+        color: Tuple[int, int, int],
+    ) -> None:
+        cv2.line(self.overlay, start, end, color, self.thickness)
+        cv2.line(self.mask, start, end, 255, self.thickness)
+        pad = self.thickness
+        x_min, x_max = min(start[0], end[0]) - pad, max(start[0], end[0]) + pad + 1
+        y_min, y_max = min(start[1], end[1]) - pad, max(start[1], end[1]) + pad + 1
+        if self.dirty is None:
+            self.dirty = [x_min, y_min, x_max, y_max]
+        else:
+            self.dirty = [
+                min(self.dirty[0], x_min),
+                min(self.dirty[1], y_min),
+                max(self.dirty[2], x_max),
+                max(self.dirty[3], y_max),
+            ]
+
+    def draw(self, image: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        """Draws the trails onto a frame and advances to the next frame.
+
+        Parameters
+        ----------
+        image : cv2.typing.MatLike
+            Frame to draw on.
+
+        Returns
+        -------
+        image : cv2.typing.MatLike
+            Frame with the trails.
+        """
+        if self.max_length is None:
+            if self.dirty is not None:
+                height, width = self.mask.shape
+                x_min, y_min = max(self.dirty[0], 0), max(self.dirty[1], 0)
+                x_max, y_max = min(self.dirty[2], width), min(self.dirty[3], height)
+                region = (slice(y_min, y_max), slice(x_min, x_max))
+                cv2.copyTo(self.overlay[region], self.mask[region], image[region])
+        else:
+            for track_id in list(self.buffers):
+                if self.frame - self.last_seen[track_id] >= self.max_length:
+                    for table in (self.buffers, self.lengths, self.colors):
+                        del table[track_id]
+                    del self.last_points[track_id], self.last_seen[track_id]
+                    continue
+                length = self.lengths[track_id]
+                if length < 2:
+                    continue
+                buffer = self.buffers[track_id]
+                if length > self.max_length:
+                    # Unroll the ring buffer from its oldest point
+                    head = length % self.max_length
+                    buffer = np.concatenate((buffer[head:], buffer[:head]))
+                else:
+                    buffer = buffer[:length]
+                image = draw_target_object_track(
+                    image, buffer, self.colors[track_id], self.thickness
+                )
+        self.frame += 1
+        return image
+
+
 def draw_target_object_tracks(
     width: int,
     height: int,
     object_centers: cv2.typing.MatLike,
-    source_video: str,
+    source_video: Union[str, FrameCache],
     save_path: str,
     codec: str = "avc1",
     fps: int = 30,
-) -> None:
+    backend: str = "opencv",
+    preview: Optional[Preview] = None,
+) -> RenderStats:
     assert len(object_centers) > 0
-    Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-    count = 0
-    cap = cv2.VideoCapture(source_video)
-    ok, image = cap.read()
-    vidwrite = cv2.VideoWriter(
-        save_path,
-        cv2.VideoWriter_fourcc(*codec),  # type: ignore
-        fps,
-        (width, height),
+    out_width, out_height = (
+        (width, height) if preview is None else preview.size(width, height)
     )
-    curr_track = []
-    while ok and count < len(object_centers):
-        pos_x, pos_y = object_centers[count]
-        image = cv2.resize(image, (width, height))
+    trails = TrackTrails(out_width, out_height)
+
+    def draw(count: int, image: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        frame = count if preview is None else preview.frame(count)
+        pos_x, pos_y = object_centers[frame]
         if pos_x != MISSING_VALUE and pos_y != MISSING_VALUE:
-            curr_track.append((pos_x, pos_y))
-        if len(curr_track) > 1:
-            image = draw_target_object_track(image, np.array(curr_track))
-        vidwrite.write(image)
-        count += 1
-        ok, image = cap.read()
-    vidwrite.release()
+            if preview is not None:
+                pos_x, pos_y = preview.point(pos_x, pos_y, width, height)
+            # With a stride, the trail joins the centers of the rendered frames
+            trails.add(0, (pos_x, pos_y), color=(0, 0, 255))
+        return trails.draw(image)
+
+    return render_video(
+        frame_source(
+            source_video,
+            width,
+            height,
+            max_frames=len(object_centers),
+            preview=preview,
+        ),
+        draw,
+        make_video_writer(save_path, out_width, out_height, fps, codec, backend),
+    )
@@ -0,0 +1,213 @@
+import csv
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+# Stages of BoundingBoxMatcher.update in the order they run
+STAGES = ("cost", "assign", "filter", "birth", "prune")
+
+# Counters reported for every frame by BoundingBoxMatcher.update
+COUNTERS = (
+    "detections",
+    "cost_entries",
+    "matches",
+    "rejected",
+    "births",
+    "deaths",
+    "tracks_alive",
+    # 1 for the association path the frame took, see object_tracking.algorithms.budget.PATHS
+    "path_exact",
+    "path_greedy",
+    "path_gated",
+    "path_coast",
+)
+
+# Upper bounds of the latency buckets (seconds), from 10 us to 10 s
+DEFAULT_BUCKETS = tuple(
+    float(f"{m}e{e}") for e in range(-5, 1) for m in (1, 2.5, 5)
+) + (10.0,)
+
+
+class HistogramSink:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Accumulates a latency histogram per stage and running totals of the counters in memory.
+
+        Parameters
+        ----------
+        buckets : Sequence[float], optional
+            Increasing upper bounds of the latency buckets (seconds), by default DEFAULT_BUCKETS
+        """
+        self.buckets = np.asarray(buckets, dtype=np.float64)
+        # The last column counts latencies above the largest bound
+        self.bucket_counts = np.zeros((len(STAGES), len(self.buckets) + 1), np.int64)
+        self.seconds = np.zeros(len(STAGES), dtype=np.float64)
+        self.frames = 0
+        # tracks_alive is a level rather than a count of events, so it is only kept from the last frame
+        self.totals = {name: 0 for name in COUNTERS if name != "tracks_alive"}
+        self.last: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+
+    def write(self, frame: int, seconds: Dict[str, float], counters: Dict[str, int]):
+        latencies = np.array([seconds[stage] for stage in STAGES])
+        self.bucket_counts[
+            np.arange(len(STAGES)), np.searchsorted(self.buckets, latencies)
+        ] += 1
+        self.seconds += latencies
+        self.frames += 1
+        for name in self.totals:
+            self.totals[name] += counters[name]
+        self.last = counters
+
+    def percentile(self, stage: str, q: float) -> float:
+        """Returns the upper bound of the bucket holding the q-th percentile (0-100) of a stage's latency."""
+        counts = self.bucket_counts[STAGES.index(stage)]
+        if self.frames == 0:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(counts), q / 100.0 * self.frames))
+        return float(self.buckets[bucket]) if bucket < len(self.buckets) else np.inf
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns the mean, p50, p90 and p99 latency (seconds) of each stage."""
+        return {
+            stage: {
+                "mean": float(self.seconds[s]) / self.frames if self.frames else 0.0,
+                "p50": self.percentile(stage, 50),
+                "p90": self.percentile(stage, 90),
+                "p99": self.percentile(stage, 99),
+            }
+            for s, stage in enumerate(STAGES)
+        }
+
+    def close(self) -> None:
+        pass
+
+
+class CSVSink:
+    def __init__(self, save_path: str) -> None:
+        """Writes the stage latencies and counters of every frame as a row of a CSV file.
+
+        Parameters
+        ----------
+        save_path : str
+            Path to the CSV file, overwritten if it exists.
+        """
+        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(save_path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(
+            ["frame"] + [f"{stage}_seconds" for stage in STAGES] + list(COUNTERS)
+        )
+
+    def write(self, frame: int, seconds: Dict[str, float], counters: Dict[str, int]):
+        self.writer.writerow(
+            [frame]
+            + [f"{seconds[stage]:.9f}" for stage in STAGES]
+            + [counters[name] for name in COUNTERS]
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class PrometheusSink:
+    def __init__(
+        self,
+        save_path: str,
+        every: int = 30,
+        prefix: str = "object_tracking",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Exports the stage latency histograms and counters in the Prometheus text format.
+
+        The file is replaced atomically, so it can be read by the node exporter's textfile collector at any time.
+
+        Parameters
+        ----------
+        save_path : str
+            Path to the .prom file.
+        every : int, optional
+            Number of frames between two exports, by default 30
+        prefix : str, optional
+            Prefix of the metric names, by default "object_tracking"
+        buckets : Sequence[float], optional
+            Increasing upper bounds of the latency buckets (seconds), by default DEFAULT_BUCKETS
+        """
+        self.save_path = Path(save_path)
+        self.save_path.parent.mkdir(parents=True, exist_ok=True)
+        self.every = every
+        self.prefix = prefix
+        self.histogram = HistogramSink(buckets)
+
+    def write(self, frame: int, seconds: Dict[str, float], counters: Dict[str, int]):
+        self.histogram.write(frame, seconds, counters)
+        if self.histogram.frames % self.every == 0:
+            self.export()
+
+    def export(self) -> None:
+        """Writes the current metrics to the .prom file."""
+        histogram, prefix = self.histogram, self.prefix
+        lines: List[str] = [
+            f"# HELP {prefix}_stage_seconds Time spent in each stage of an update.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for s, stage in enumerate(STAGES):
+            cumulative = np.cumsum(histogram.bucket_counts[s]).tolist()
+            bounds = [repr(float(b)) for b in histogram.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, cumulative):
+                lines.append(
+                    f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.seconds[s]!r}'
+            )
+            lines.append(
+                f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.frames}'
+            )
+
+        lines += [
+            f"# TYPE {prefix}_frames_total counter",
+            f"{prefix}_frames_total {histogram.frames}",
+            f"# TYPE {prefix}_tracks_alive gauge",
+            f"{prefix}_tracks_alive {histogram.last['tracks_alive']}",
+        ]
+        for name, total in histogram.totals.items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {total}")
+
+        tmp_path = self.save_path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.save_path)
+
+    def close(self) -> None:
+        self.export()
+
+
+class Instrumentation:
+    def __init__(self, sinks: Optional[Iterable] = None) -> None:
+        """Collects per-frame stage timings and counters from BoundingBoxMatcher.update.
+
+        Parameters
+        ----------
+        sinks : Optional[Iterable], optional
+            Objects with write(frame, seconds, counters) and close() methods, by default a single HistogramSink
+        """
+        self.sinks = list(sinks) if sinks is not None else [HistogramSink()]
+        self.frame = 0
+
+    def record(self, seconds: Dict[str, float], counters: Dict[str, int]) -> None:
+        """Passes the stage timings (seconds) and counters of one frame to every sink."""
+        for sink in self.sinks:
+            sink.write(self.frame, seconds, counters)
+        self.frame += 1
+
+    def close(self) -> None:
+        """Flushes and closes every sink."""
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self) -> "Instrumentation":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
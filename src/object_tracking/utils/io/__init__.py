@@ -1,7 +1,6 @@
 import json
 from typing import Dict
 from pathlib import Path
-import cv2
 
 
 def load_obj_each_frame(data_file: str) -> Dict[str, list]:
@@ -18,6 +17,9 @@ def crop_video_dimensions(
     codec: str = "avc1",
     fps: int = 30,
 ) -> None:
+    # OpenCV is only needed here, so reading detections does not load it
+    import cv2
+
     Path(save_path).parent.mkdir(parents=True, exist_ok=True)
     cap = cv2.VideoCapture(source_video)
     ok, image = cap.read()
@@ -0,0 +1,118 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import numpy as np
+from object_tracking import MISSING_VALUE
+
+BOX_COLUMNS = ("x_min", "y_min", "width", "height")
+
+
+class FrameDetections:
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        boxes: np.ndarray,
+        ids: Optional[np.ndarray] = None,
+    ) -> None:
+        """Detections of every frame stored as compressed sparse rows.
+
+        The detections of frame f are rows offsets[f]:offsets[f + 1] of boxes and ids,
+        so per-frame access is a slice that never copies, also when the arrays are memory-mapped.
+
+        Parameters
+        ----------
+        offsets : np.ndarray
+            Array of shape (F + 1,) of the first row of each frame, ending with the number of detections.
+        boxes : np.ndarray
+            Array of shape (M, 4) of bounding boxes as (x_min, y_min, width, height).
+        ids : Optional[np.ndarray], optional
+            Array of shape (M,) of track identifiers, by default MISSING_VALUE for every detection
+        """
+        self.offsets = offsets
+        self.boxes = boxes
+        self.ids = (
+            np.full(len(boxes), MISSING_VALUE, dtype=np.int64) if ids is None else ids
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, frame: int) -> np.ndarray:
+        """Returns a view of shape (D, 4) of the bounding boxes of a frame."""
+        return self.boxes[self.offsets[frame] : self.offsets[frame + 1]]
+
+    def frame_ids(self, frame: int) -> np.ndarray:
+        """Returns a view of shape (D,) of the track identifiers of a frame."""
+        return self.ids[self.offsets[frame] : self.offsets[frame + 1]]
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns a view of shape (M,) of one of x_min, y_min, width, height or id across all frames."""
+        if name == "id":
+            return self.ids
+        return self.boxes[:, BOX_COLUMNS.index(name)]
+
+    @classmethod
+    def from_frame_dict(
+        cls, frame_dict: Dict[str, List[Dict[str, int]]]
+    ) -> "FrameDetections":
+        """Converts detections keyed by string frame numbers, as in frame_dict.json."""
+        frames = [frame_dict[str(f)] for f in range(len(frame_dict))]
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(detections) for detections in frames])
+        detections = [det for detections in frames for det in detections]
+        boxes = np.array(
+            [[det[column] for column in BOX_COLUMNS] for det in detections],
+            dtype=np.int32,
+        ).reshape(-1, 4)
+        ids = np.array(
+            [det.get("id", MISSING_VALUE) for det in detections], dtype=np.int64
+        )
+        return cls(offsets, boxes, ids)
+
+    def to_frame_dict(self) -> Dict[str, List[Dict[str, int]]]:
+        """Converts back to detections keyed by string frame numbers, omitting missing ids."""
+        frame_dict = {}
+        boxes, ids = self.boxes.tolist(), self.ids.tolist()
+        for frame in range(len(self)):
+            detections = []
+            for row in range(self.offsets[frame], self.offsets[frame + 1]):
+                det = dict(zip(BOX_COLUMNS, boxes[row]))
+                if ids[row] != MISSING_VALUE:
+                    det["id"] = ids[row]
+                detections.append(det)
+            frame_dict[str(frame)] = detections
+        return frame_dict
+
+    def save(self, save_path: str) -> None:
+        """Saves to a .npz file, or otherwise to a directory of .npy files that load memory-mapped."""
+        path = Path(save_path)
+        arrays = {"offsets": self.offsets, "boxes": self.boxes, "ids": self.ids}
+        if path.suffix == ".npz":
+            path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(path, **arrays)
+            return
+        path.mkdir(parents=True, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(path / f"{name}.npy", array)
+
+    @classmethod
+    def load(cls, data_path: str, mmap_mode: Optional[str] = "r") -> "FrameDetections":
+        """Loads from a .npz file or a directory of .npy files, memory-mapped with mmap_mode for directories."""
+        path = Path(data_path)
+        if path.suffix == ".npz":
+            with np.load(path) as arrays:
+                return cls(arrays["offsets"], arrays["boxes"], arrays["ids"])
+        return cls(
+            *(
+                np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+                for name in ("offsets", "boxes", "ids")
+            )
+        )
+
+
+def convert_frame_dict(data_file: str, save_path: str) -> FrameDetections:
+    """Converts a frame_dict.json file to the columnar format."""
+    with open(data_file, "r") as file:
+        detections = FrameDetections.from_frame_dict(json.load(file))
+    detections.save(save_path)
+    return detections
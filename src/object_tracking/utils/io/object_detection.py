@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, TextIO, Union
 import json
 
 
@@ -9,3 +9,40 @@ def save_bounding_boxes(
 ) -> None:
     Path(save_path).parent.mkdir(parents=True, exist_ok=True)
     json.dump(bounding_boxes, open(save_path, "w"))
+
+
+def iter_bounding_boxes(
+    source: Union[str, TextIO],
+) -> Iterator[List[Dict[str, int]]]:
+    """Reads detections frame by frame from a JSONL file.
+
+    Each line holds one frame, either as a list of detections or as an
+    object with a "detections" list, e.g. {"frame": 0, "detections": [...]}.
+    """
+    if isinstance(source, str):
+        with open(source, "r") as file:
+            yield from iter_bounding_boxes(file)
+        return
+
+    for line in source:
+        if not line.strip():
+            continue
+        frame = json.loads(line)
+        yield frame["detections"] if isinstance(frame, dict) else frame
+
+
+def save_bounding_boxes_stream(
+    frames: Iterable[List[Dict[str, int]]],
+    save_path: str,
+) -> int:
+    """Writes tracked detections to a JSONL file as they are produced.
+
+    Each line is {"frame": k, "detections": [...]}. Returns the number of frames written.
+    """
+    Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(save_path, "w") as file:
+        for count, detections in enumerate(frames, start=1):
+            file.write(json.dumps({"frame": count - 1, "detections": detections}))
+            file.write("\n")
+    return count
@@ -0,0 +1,106 @@
+from typing import Tuple
+import numpy as np
+from object_tracking.utils.io.columnar import FrameDetections
+
+MOTION_MODELS = ("constant_velocity", "random_walk", "static")
+
+
+def generate_scene(
+    num_objects: int,
+    num_frames: int,
+    width: int = 1920,
+    height: int = 1080,
+    motion: str = "constant_velocity",
+    speed: float = 2.0,
+    miss_rate: float = 0.0,
+    clutter: float = 0.0,
+    noise: float = 1.0,
+    min_size: int = 10,
+    max_size: int = 40,
+    seed: int = 0,
+) -> Tuple[FrameDetections, FrameDetections]:
+    """Generates a seeded synthetic scene of moving boxes with missed and false detections.
+
+    Parameters
+    ----------
+    num_objects : int
+        Number of objects in the scene.
+    num_frames : int
+        Number of frames.
+    width : int, optional
+        Width of the scene (pixels), by default 1920
+    height : int, optional
+        Height of the scene (pixels), by default 1080
+    motion : str, optional
+        One of "constant_velocity", "random_walk" or "static", by default "constant_velocity"
+    speed : float, optional
+        Typical speed of the objects (pixels per frame), by default 2.0
+    miss_rate : float, optional
+        Probability that an object is not detected in a frame, by default 0.0
+    clutter : float, optional
+        Expected number of false detections per frame, by default 0.0
+    noise : float, optional
+        Standard deviation of the detected box position (pixels), by default 1.0
+    min_size : int, optional
+        Minimum box side (pixels), by default 10
+    max_size : int, optional
+        Maximum box side (pixels), by default 40
+    seed : int, optional
+        Seed of the random number generator, by default 0
+
+    Returns
+    -------
+    detections : FrameDetections
+        Detections of each frame in random order, without ids.
+    ground_truth : FrameDetections
+        True box of every object in each frame, with the object index as id.
+    """
+    if motion not in MOTION_MODELS:
+        raise ValueError(f"Unknown motion '{motion}', expected one of {MOTION_MODELS}")
+    rng = np.random.default_rng(seed)
+    bounds = np.array([width, height], dtype=np.float64)
+
+    sizes = rng.integers(min_size, max_size + 1, (num_objects, 2))
+    positions = rng.uniform(0, 1, (num_objects, 2)) * (bounds - sizes)
+    angles = rng.uniform(0, 2 * np.pi, num_objects)
+    velocities = speed * np.column_stack((np.cos(angles), np.sin(angles)))
+    if motion == "static":
+        velocities[:] = 0.0
+
+    truth_boxes, truth_counts = [], []
+    detection_boxes, detection_counts = [], []
+    for _ in range(num_frames):
+        truth = np.column_stack((positions, sizes)).round().astype(np.int32)
+        truth_boxes.append(truth)
+        truth_counts.append(num_objects)
+
+        detected = rng.random(num_objects) >= miss_rate
+        boxes = truth[detected].astype(np.float64)
+        boxes[:, :2] += rng.normal(0, noise, (len(boxes), 2))
+        num_clutter = rng.poisson(clutter)
+        clutter_sizes = rng.integers(min_size, max_size + 1, (num_clutter, 2))
+        clutter_positions = rng.uniform(0, 1, (num_clutter, 2)) * (
+            bounds - clutter_sizes
+        )
+        boxes = np.vstack((boxes, np.column_stack((clutter_positions, clutter_sizes))))
+        detection_boxes.append(rng.permutation(boxes.round().astype(np.int32)))
+        detection_counts.append(len(boxes))
+
+        # Advance the objects and bounce them off the borders of the scene
+        if motion == "random_walk":
+            velocities += rng.normal(0, speed / 4, velocities.shape)
+        positions += velocities
+        low, high = positions < 0, positions > bounds - sizes
+        velocities[low | high] *= -1
+        positions = np.clip(positions, 0, bounds - sizes)
+
+    def to_columnar(boxes, counts) -> FrameDetections:
+        offsets = np.zeros(num_frames + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+        boxes = np.vstack(boxes) if boxes else np.zeros((0, 4), dtype=np.int32)
+        return FrameDetections(offsets, boxes.reshape(-1, 4))
+
+    detections = to_columnar(detection_boxes, detection_counts)
+    ground_truth = to_columnar(truth_boxes, truth_counts)
+    ground_truth.ids = np.tile(np.arange(num_objects, dtype=np.int64), num_frames)
+    return detections, ground_truth
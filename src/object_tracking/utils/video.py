@@ -0,0 +1,537 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import cv2
+import cv2.typing
+import numpy as np
+
+# FFmpeg encoders for the fourcc codes accepted by cv2.VideoWriter
+FOURCC_TO_FFMPEG = {
+    "avc1": "libx264",
+    "h264": "libx264",
+    "x264": "libx264",
+    "mp4v": "mpeg4",
+    "xvid": "libxvid",
+    "mjpg": "mjpeg",
+}
+
+_END = object()
+
+
+class RenderStats:
+    def __init__(self, frames: int, elapsed: float, stage_seconds: Dict[str, float]):
+        """Throughput report of a render.
+
+        Parameters
+        ----------
+        frames : int
+            Number of frames written.
+        elapsed : float
+            Wall-clock time of the render (seconds).
+        stage_seconds : Dict[str, float]
+            Time each stage spent working, excluding time spent waiting on its queues (seconds).
+        """
+        self.frames = frames
+        self.elapsed = elapsed
+        self.stage_seconds = stage_seconds
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self) -> str:
+        stages = ", ".join(
+            f"{stage} {self.frames / seconds if seconds > 0 else float('inf'):.1f} fps"
+            for stage, seconds in self.stage_seconds.items()
+        )
+        return f"{self.frames} frames in {self.elapsed:.2f}s ({self.fps:.1f} fps; {stages})"
+
+
+class OpenCVVideoWriter:
+    def __init__(
+        self, save_path: str, width: int, height: int, fps: int, codec: str = "avc1"
+    ) -> None:
+        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        self.writer = cv2.VideoWriter(
+            save_path,
+            cv2.VideoWriter_fourcc(*codec),  # type: ignore
+            fps,
+            (width, height),
+        )
+
+    def write(self, image: cv2.typing.MatLike) -> None:
+        self.writer.write(image)
+
+    def release(self) -> None:
+        self.writer.release()
+
+
+class FFmpegVideoWriter:
+    def __init__(
+        self, save_path: str, width: int, height: int, fps: int, codec: str = "avc1"
+    ) -> None:
+        import ffmpeg
+
+        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        self.process = (
+            ffmpeg.input(
+                "pipe:",
+                format="rawvideo",
+                pix_fmt="bgr24",
+                s=f"{width}x{height}",
+                framerate=fps,
+            )
+            .output(
+                save_path,
+                vcodec=FOURCC_TO_FFMPEG.get(codec.lower(), codec),
+                pix_fmt="yuv420p",
+            )
+            .global_args("-loglevel", "error", "-nostats")
+            .overwrite_output()
+            .run_async(pipe_stdin=True, pipe_stderr=True)
+        )
+        # ffmpeg blocks once the pipe of its messages is full, so they are read as it writes them
+        self.errors: List[bytes] = []
+        self.reader = threading.Thread(
+            target=lambda: self.errors.extend(self.process.stderr), daemon=True
+        )
+        self.reader.start()
+
+    def write(self, image: cv2.typing.MatLike) -> None:
+        try:
+            self.process.stdin.write(
+                np.ascontiguousarray(image, dtype=np.uint8).tobytes()
+            )
+        except BrokenPipeError:
+            # ffmpeg stopped, raise with its message
+            self.release()
+            raise
+
+    def release(self) -> None:
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+        self.reader.join()
+        if self.process.returncode != 0:
+            message = b"".join(self.errors).decode(errors="replace").strip()
+            raise RuntimeError(
+                f"ffmpeg exited with code {self.process.returncode}: {message}"
+            )
+
+
+VIDEO_WRITERS = {
+    "opencv": OpenCVVideoWriter,
+    "ffmpeg": FFmpegVideoWriter,
+}
+
+
+def make_video_writer(
+    save_path: str,
+    width: int,
+    height: int,
+    fps: int = 30,
+    codec: str = "avc1",
+    backend: str = "opencv",
+):
+    if backend not in VIDEO_WRITERS:
+        raise ValueError(
+            f"Unknown backend '{backend}', expected one of {list(VIDEO_WRITERS)}"
+        )
+    return VIDEO_WRITERS[backend](save_path, width, height, fps, codec)
+
+
+class Preview:
+    def __init__(
+        self,
+        stride: int = 1,
+        start: int = 0,
+        stop: Optional[int] = None,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        scale: float = 1.0,
+    ) -> None:
+        """Selects the frames and the region of a video to render, for quick reviews of long videos.
+
+        Only frames start, start + stride, ... before stop are decoded, after seeking to start.
+        Each frame is cropped to the region of interest and scaled in one resize, so drawing
+        works on the small output frames and coordinates are mapped with point and length.
+
+        Parameters
+        ----------
+        stride : int, optional
+            Render every stride-th frame, by default 1
+        start : int, optional
+            First frame to render, by default 0
+        stop : Optional[int], optional
+            Frame to stop before, by default None (the end of the video)
+        roi : Optional[Tuple[int, int, int, int]], optional
+            Region (x_min, y_min, width, height) of the (width, height) frames to render,
+            by default None (the whole frame)
+        scale : float, optional
+            Scale of the output relative to the region, by default 1.0
+        """
+        if stride < 1 or start < 0 or scale <= 0:
+            raise ValueError(
+                f"Invalid preview stride={stride}, start={start}, scale={scale}"
+            )
+        self.stride = stride
+        self.start = start
+        self.stop = stop
+        self.roi = roi
+        self.scale = scale
+
+    def region(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """Returns the region (x_min, y_min, x_max, y_max) of the (width, height) frames that is rendered."""
+        if self.roi is None:
+            return 0, 0, width, height
+        x, y, roi_width, roi_height = self.roi
+        x_min, y_min = max(x, 0), max(y, 0)
+        x_max, y_max = min(x + roi_width, width), min(y + roi_height, height)
+        if x_min >= x_max or y_min >= y_max:
+            raise ValueError(
+                f"Region {self.roi} is outside the {width}x{height} frames"
+            )
+        return x_min, y_min, x_max, y_max
+
+    def size(self, width: int, height: int) -> Tuple[int, int]:
+        """Returns the (width, height) of the rendered frames."""
+        if self.roi is None and self.scale == 1.0:
+            return width, height
+        x_min, y_min, x_max, y_max = self.region(width, height)
+        # Even sizes, which yuv420p encoders require
+        return (
+            2 * max(round((x_max - x_min) * self.scale / 2), 1),
+            2 * max(round((y_max - y_min) * self.scale / 2), 1),
+        )
+
+    def frame(self, count: int) -> int:
+        """Returns the index in the video of the count-th rendered frame."""
+        return self.start + count * self.stride
+
+    def point(self, x: float, y: float, width: int, height: int) -> Tuple[int, int]:
+        """Maps a point of the (width, height) frames to the rendered frames."""
+        x_min, y_min, x_max, y_max = self.region(width, height)
+        out_width, out_height = self.size(width, height)
+        return (
+            round((x - x_min) * out_width / (x_max - x_min)),
+            round((y - y_min) * out_height / (y_max - y_min)),
+        )
+
+    def length(self, dx: float, dy: float, width: int, height: int) -> Tuple[int, int]:
+        """Maps a horizontal and a vertical length of the (width, height) frames to the rendered frames."""
+        x_min, y_min, x_max, y_max = self.region(width, height)
+        out_width, out_height = self.size(width, height)
+        return (
+            round(dx * out_width / (x_max - x_min)),
+            round(dy * out_height / (y_max - y_min)),
+        )
+
+    def apply(self, image: cv2.typing.MatLike, width: int, height: int) -> np.ndarray:
+        """Crops an image of any size showing a (width, height) frame and resizes it to the rendered size."""
+        out_width, out_height = self.size(width, height)
+        if self.roi is not None:
+            x_min, y_min, x_max, y_max = self.region(width, height)
+            scale_x, scale_y = image.shape[1] / width, image.shape[0] / height
+            image = image[
+                round(y_min * scale_y) : round(y_max * scale_y),
+                round(x_min * scale_x) : round(x_max * scale_x),
+            ]
+        if image.shape[:2] == (out_height, out_width):
+            return np.array(image)
+        return cv2.resize(image, (out_width, out_height))
+
+
+def read_frames(
+    source_video: str,
+    width: int,
+    height: int,
+    max_frames: Optional[int] = None,
+    preview: Optional[Preview] = None,
+) -> Iterator[cv2.typing.MatLike]:
+    """Decodes a video and resizes each frame to (width, height), or to the frames selected by a preview."""
+    if preview is None:
+        preview = Preview()
+    stop = preview.stop
+    if max_frames is not None:
+        stop = max_frames if stop is None else min(stop, max_frames)
+    cap = cv2.VideoCapture(source_video)
+    try:
+        if preview.start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, preview.start)
+        index = preview.start
+        while stop is None or index < stop:
+            ok, image = cap.read()
+            if not ok:
+                break
+            yield preview.apply(image, width, height)
+            index += preview.stride
+            # Skipped frames are only grabbed, without converting or resizing them
+            for _ in range(preview.stride - 1):
+                if not cap.grab():
+                    return
+    finally:
+        cap.release()
+
+
+def default_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+    return Path(cache_home) / "object_tracking" / "frames"
+
+
+# Seconds after which the lock of a frame store that is not being written is taken over
+LOCK_TIMEOUT = 60.0
+
+
+class FrameCache:
+    def __init__(
+        self,
+        source_video: str,
+        width: int,
+        height: int,
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        """Decodes and resizes a video once into a memory-mapped uint8 frame store on local disk.
+
+        The store is keyed on the source path, its modification time and the target size, so it
+        is rebuilt when the video changes and reused by every later render of the same video.
+        Processes opening the same store at once build it once, the others wait for it.
+
+        Parameters
+        ----------
+        source_video : str
+            Path to the video.
+        width : int
+            Width of the stored frames.
+        height : int
+            Height of the stored frames.
+        cache_dir : Optional[str], optional
+            Directory of the frame stores, by default $XDG_CACHE_HOME/object_tracking/frames
+        """
+        self.source_video = source_video
+        self.width = width
+        self.height = height
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+
+        source = Path(source_video).resolve()
+        source_key = hashlib.sha1(str(source).encode()).hexdigest()[:16]
+        self.prefix = f"{source.stem}-{source_key}-{width}x{height}"
+        self.path = self.cache_dir / f"{self.prefix}-{source.stat().st_mtime_ns}.u8"
+        self.meta_path = self.path.with_suffix(".json")
+
+        if not self.meta_path.exists():
+            self._build()
+        with open(self.meta_path, "r") as file:
+            num_frames = json.load(file)["frames"]
+        shape = (num_frames, height, width, 3)
+        # An empty file cannot be memory-mapped
+        self.frames = (
+            np.memmap(self.path, dtype=np.uint8, mode="r", shape=shape)
+            if num_frames
+            else np.zeros(shape, dtype=np.uint8)
+        )
+
+    def _build(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_suffix(".lock")
+        # Another process building the same store holds the lock, its store is reused once written
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                if self.meta_path.exists():
+                    return
+                try:
+                    idle = time.time() - lock_path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                # The builder touches the lock as it writes, so an untouched lock was left by a crash
+                if idle > LOCK_TIMEOUT:
+                    lock_path.unlink(missing_ok=True)
+                time.sleep(0.1)
+
+        try:
+            if self.meta_path.exists():
+                return
+            # Stores of older versions of the same video and size are stale, the files of
+            # this version may be in use by builders of other processes
+            for stale in self.cache_dir.glob(f"{self.prefix}-*"):
+                if stale.suffix in (".u8", ".json") and stale.stem != self.path.stem:
+                    stale.unlink(missing_ok=True)
+
+            tmp_path = self.path.with_suffix(f".tmp{os.getpid()}")
+            num_frames = 0
+            with open(tmp_path, "wb") as file:
+                for image in read_frames(self.source_video, self.width, self.height):
+                    file.write(np.ascontiguousarray(image).tobytes())
+                    num_frames += 1
+                    if num_frames % 100 == 0:
+                        os.utime(lock_path)
+            os.replace(tmp_path, self.path)
+            # The metadata is written last so an interrupted build is never reused
+            tmp_meta_path = self.meta_path.with_suffix(f".jsontmp{os.getpid()}")
+            with open(tmp_meta_path, "w") as file:
+                json.dump(
+                    {"frames": num_frames, "source_video": self.source_video}, file
+                )
+            os.replace(tmp_meta_path, self.meta_path)
+        finally:
+            lock_path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.frames[index]
+
+
+def frame_source(
+    source_video: Union[str, FrameCache],
+    width: int,
+    height: int,
+    max_frames: Optional[int] = None,
+    preview: Optional[Preview] = None,
+) -> Iterator[cv2.typing.MatLike]:
+    """Yields writable frames of size (width, height) from a video path or a FrameCache.
+
+    With a preview, only its frames are yielded, at the size of its output.
+    """
+    if not isinstance(source_video, FrameCache):
+        yield from read_frames(source_video, width, height, max_frames, preview)
+        return
+
+    if (source_video.width, source_video.height) != (width, height):
+        raise ValueError(
+            f"FrameCache holds {source_video.width}x{source_video.height} frames, "
+            f"but {width}x{height} were requested"
+        )
+    if preview is None:
+        preview = Preview()
+    num_frames = len(source_video)
+    if max_frames is not None:
+        num_frames = min(num_frames, max_frames)
+    if preview.stop is not None:
+        num_frames = min(num_frames, preview.stop)
+    for index in range(preview.start, num_frames, preview.stride):
+        # The only copy: a writable buffer for the annotations, no decoding
+        yield preview.apply(source_video[index], width, height)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def render_video(
+    frames: Iterable[cv2.typing.MatLike],
+    draw: Callable[[int, cv2.typing.MatLike], cv2.typing.MatLike],
+    writer,
+    queue_size: int = 8,
+) -> RenderStats:
+    """Decodes, draws and encodes frames in separate threads joined by bounded queues.
+
+    Frames are drawn in order by a single thread, so draw may keep state between frames.
+    Throughput is bounded by the slowest stage rather than the sum of all stages.
+
+    Parameters
+    ----------
+    frames : Iterable[cv2.typing.MatLike]
+        Source frames, e.g. from read_frames. Iterated in the decode thread.
+    draw : Callable[[int, cv2.typing.MatLike], cv2.typing.MatLike]
+        Called with the frame index and frame, returns the annotated frame.
+    writer
+        Video writer with write and release methods, e.g. from make_video_writer. Released when done.
+    queue_size : int, optional
+        Maximum number of frames buffered between two stages, by default 8
+
+    Returns
+    -------
+    stats : RenderStats
+        Number of frames, wall-clock time and per-stage busy time of the render.
+    """
+    decoded: queue.Queue = queue.Queue(maxsize=queue_size)
+    drawn: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    stage_seconds = {"decode": 0.0, "draw": 0.0, "encode": 0.0}
+
+    def decode() -> None:
+        try:
+            iterator = iter(frames)
+            while True:
+                start = time.perf_counter()
+                image = next(iterator, _END)
+                stage_seconds["decode"] += time.perf_counter() - start
+                if image is _END or not _put(decoded, image, stop):
+                    break
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            _put(decoded, _END, stop)
+
+    def annotate() -> None:
+        try:
+            count = 0
+            while True:
+                image = _get(decoded, stop)
+                if image is _END:
+                    break
+                start = time.perf_counter()
+                image = draw(count, image)
+                stage_seconds["draw"] += time.perf_counter() - start
+                count += 1
+                if not _put(drawn, image, stop):
+                    break
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            _put(drawn, _END, stop)
+
+    threads = [
+        threading.Thread(target=decode, daemon=True),
+        threading.Thread(target=annotate, daemon=True),
+    ]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    count = 0
+    try:
+        while True:
+            image = _get(drawn, stop)
+            if image is _END:
+                break
+            start = time.perf_counter()
+            writer.write(image)
+            stage_seconds["encode"] += time.perf_counter() - start
+            count += 1
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        writer.release()
+
+    if errors:
+        raise errors[0]
+
+    return RenderStats(count, time.perf_counter() - start_time, stage_seconds)
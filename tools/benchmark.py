@@ -0,0 +1,295 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+from typing import Dict, List
+import numpy as np
+from object_tracking import MISSING_VALUE
+from object_tracking.algorithms.cost import box_centroids
+from object_tracking.algorithms.matching import MATCHERS, HungarianMatcher
+from object_tracking.algorithms.multi_stream import MultiStreamMatcher
+from object_tracking.algorithms.object_detection import BoundingBoxMatcher
+from object_tracking.algorithms.object_tracking import AlphaBetaFilter2D
+from object_tracking.utils.synthetic import generate_scene
+
+
+def summarize(name: str, n: int, latencies: List[float], items: int) -> Dict:
+    latencies_ms = np.array(latencies) * 1e3
+    total = float(np.sum(latencies))
+    return {
+        "benchmark": name,
+        "n": n,
+        "calls": len(latencies),
+        "fps": items / total if total > 0 else float("inf"),
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p90": float(np.percentile(latencies_ms, 90)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "max": float(latencies_ms.max()),
+        },
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark_tracker(detections, n: int, args) -> List[Dict]:
+    results = []
+    dense = n <= args.dense_limit
+    matcher = BoundingBoxMatcher(
+        None, args.max_distance_threshold, args.max_frame_skipped, args.fps
+    )
+    gated_matcher = BoundingBoxMatcher(
+        None,
+        args.max_distance_threshold,
+        args.max_frame_skipped,
+        args.fps,
+        gate_distance=args.gate_distance,
+    )
+    backend_matchers = {
+        name: BoundingBoxMatcher(
+            None,
+            args.max_distance_threshold,
+            args.max_frame_skipped,
+            args.fps,
+            matcher=name,
+        )
+        for name in args.matchers
+    }
+    hungarian = HungarianMatcher()
+    latencies = {
+        "cost_matrix": [],
+        "hungarian": [],
+        "update": [],
+        **{f"update_{name}": [] for name in args.matchers},
+        "update_gated": [],
+    }
+    for frame in range(len(detections)):
+        boxes = detections[frame]
+        if dense:
+            # Time the stages on the current tracker state before it consumes the frame
+            cost_matrix, seconds = timed(matcher._calculate_cost_matrix, boxes)
+            latencies["cost_matrix"].append(seconds)
+            latencies["hungarian"].append(timed(hungarian, cost_matrix)[1])
+            latencies["update"].append(timed(matcher._update, boxes)[1])
+            for name, backend_matcher in backend_matchers.items():
+                latencies[f"update_{name}"].append(
+                    timed(backend_matcher._update, boxes)[1]
+                )
+        latencies["update_gated"].append(timed(gated_matcher._update, boxes)[1])
+
+    names = {
+        "cost_matrix": "BoundingBoxMatcher._calculate_cost_matrix",
+        "hungarian": "HungarianMatcher.__call__",
+        "update": "BoundingBoxMatcher.update",
+        **{
+            f"update_{name}": f"BoundingBoxMatcher.update[{name}]"
+            for name in args.matchers
+        },
+        "update_gated": "BoundingBoxMatcher.update[gate_distance]",
+    }
+    for key, name in names.items():
+        if latencies[key]:
+            results.append(
+                summarize(name, n, latencies[key], items=len(latencies[key]))
+            )
+        else:
+            results.append({"benchmark": name, "n": n, "skipped": "n > dense_limit"})
+    return results
+
+
+def benchmark_filter(ground_truth, n: int, args) -> List[Dict]:
+    rng = np.random.default_rng(args.seed)
+    num_frames = len(ground_truth)
+    centers = box_centroids(ground_truth.boxes).reshape(num_frames, n, 2)
+    trajectories = np.ascontiguousarray(centers.transpose(1, 0, 2)).round()
+    trajectories[rng.random((n, num_frames)) < args.miss_rate] = MISSING_VALUE
+
+    def make_filter() -> AlphaBetaFilter2D:
+        return AlphaBetaFilter2D(alpha=0.25, beta=0.0025, dt=1.0 / args.fps)
+
+    latencies = [
+        timed(make_filter().predict, trajectory)[1] for trajectory in trajectories
+    ]
+    batch_latency = timed(make_filter().predict_batch, trajectories)[1]
+    return [
+        summarize("AlphaBetaFilter2D.predict", n, latencies, items=n * num_frames),
+        summarize(
+            "AlphaBetaFilter2D.predict_batch",
+            n,
+            [batch_latency],
+            items=n * num_frames,
+        ),
+    ]
+
+
+def benchmark_streams(n: int, side: int, args) -> List[Dict]:
+    # Independent scenes of n objects, one per stream
+    scenes = [
+        generate_scene(
+            num_objects=n,
+            num_frames=args.frames,
+            width=side,
+            height=side,
+            motion=args.motion,
+            miss_rate=args.miss_rate,
+            clutter=args.clutter * n,
+            seed=args.seed + stream,
+        )[0]
+        for stream in range(args.streams)
+    ]
+    params = (args.max_distance_threshold, args.max_frame_skipped, args.fps)
+    matchers = [
+        BoundingBoxMatcher(None, *params, matcher=args.stream_matcher) for _ in scenes
+    ]
+    engine = MultiStreamMatcher(args.streams, *params, matcher=args.stream_matcher)
+    loop_latencies, batched_latencies = [], []
+    for frame in range(args.frames):
+        boxes = [scene[frame] for scene in scenes]
+        start = time.perf_counter()
+        for matcher, stream_boxes in zip(matchers, boxes):
+            matcher._update(stream_boxes)
+        loop_latencies.append(time.perf_counter() - start)
+        batched_latencies.append(timed(engine.step, boxes)[1])
+
+    # Throughput counts the frames of every stream
+    items = args.frames * args.streams
+    return [
+        summarize(
+            f"BoundingBoxMatcher.update x{args.streams}[{args.stream_matcher}]",
+            n,
+            loop_latencies,
+            items,
+        ),
+        summarize(
+            f"MultiStreamMatcher.step x{args.streams}[{args.stream_matcher}]",
+            n,
+            batched_latencies,
+            items,
+        ),
+    ]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    with open(baseline_path, "r") as file:
+        baseline = {
+            (r["benchmark"], r["n"]): r
+            for r in json.load(file)["results"]
+            if "fps" in r
+        }
+    print(f"\n{'benchmark':<45} {'n':>6} {'p50 ms':>10} {'baseline':>10} {'change':>8}")
+    for result in results:
+        key = (result["benchmark"], result["n"])
+        if "fps" not in result or key not in baseline:
+            continue
+        ours = result["latency_ms"]["p50"]
+        theirs = baseline[key]["latency_ms"]["p50"]
+        change = (ours / theirs - 1) * 100 if theirs > 0 else float("inf")
+        print(
+            f"{key[0]:<45} {key[1]:>6} {ours:>10.3f} {theirs:>10.3f} {change:>+7.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the tracking stack on seeded synthetic scenes."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--motion", default="constant_velocity")
+    parser.add_argument("--miss-rate", type=float, default=0.1)
+    parser.add_argument(
+        "--clutter",
+        type=float,
+        default=0.0,
+        help="false detections per object per frame",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--max-distance-threshold", type=float, default=0.2)
+    parser.add_argument("--max-frame-skipped", type=int, default=30)
+    parser.add_argument("--gate-distance", type=float, default=50.0)
+    parser.add_argument(
+        "--dense-limit",
+        type=int,
+        default=1000,
+        help="largest object count for the dense cost matrix and Hungarian benchmarks",
+    )
+    parser.add_argument(
+        "--matchers",
+        nargs="*",
+        default=[name for name in MATCHERS if name != "hungarian"],
+        choices=list(MATCHERS),
+        help="assignment backends to benchmark BoundingBoxMatcher.update with besides hungarian",
+    )
+    parser.add_argument(
+        "--streams",
+        type=int,
+        default=0,
+        help="number of streams to compare MultiStreamMatcher with one BoundingBoxMatcher per stream, 0 to skip",
+    )
+    parser.add_argument("--stream-matcher", default="scipy", choices=list(MATCHERS))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        # Scale the scene with the object count to keep the density constant
+        side = int(200 * np.sqrt(n))
+        detections, ground_truth = generate_scene(
+            num_objects=n,
+            num_frames=args.frames,
+            width=side,
+            height=side,
+            motion=args.motion,
+            miss_rate=args.miss_rate,
+            clutter=args.clutter * n,
+            seed=args.seed,
+        )
+        stream_results = benchmark_streams(n, side, args) if args.streams else []
+        for result in (
+            benchmark_tracker(detections, n, args)
+            + benchmark_filter(ground_truth, n, args)
+            + stream_results
+        ):
+            results.append(result)
+            if "fps" in result:
+                print(
+                    f"{result['benchmark']:<45} n={n:<6} {result['fps']:>12.1f} /s "
+                    f"p50 {result['latency_ms']['p50']:.3f} ms "
+                    f"p99 {result['latency_ms']['p99']:.3f} ms"
+                )
+            else:
+                print(f"{result['benchmark']:<45} n={n:<6} skipped")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,101 @@
+import argparse
+import json
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+# Modules of the numeric core, which worker processes import, and what each may not load
+CORE_MODULES = [
+    "object_tracking.algorithms.object_tracking",
+    "object_tracking.algorithms.object_detection",
+    "object_tracking.algorithms.multi_stream",
+    "object_tracking.algorithms.chunking",
+    "object_tracking.algorithms.evaluation",
+    "object_tracking.algorithms.sweep",
+    "object_tracking.utils.io.columnar",
+    "object_tracking.cli",
+]
+FORBIDDEN_MODULES = ["cv2", "scipy", "asyncio"]
+
+
+def measure(module: str) -> Dict:
+    """Imports a module in a fresh interpreter, returning its import time and the forbidden modules it loaded."""
+    script = (
+        f"import json, sys; import {module}; "
+        f"print(json.dumps([name for name in {FORBIDDEN_MODULES!r} if name in sys.modules]))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The cumulative time of the module itself, in microseconds
+    pattern = rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$"
+    match = re.search(pattern, process.stderr, flags=re.MULTILINE)
+    return {
+        "module": module,
+        "ms": int(match.group(1)) / 1e3 if match else float("nan"),
+        "loaded": json.loads(process.stdout),
+    }
+
+
+def best_of(module: str, repeats: int) -> Dict:
+    runs = [measure(module) for _ in range(repeats)]
+    return min(runs, key=lambda run: run["ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the import time of the numeric core in fresh interpreters, failing if "
+        "it loads OpenCV, SciPy or asyncio or gets slower than a budget or a previous run."
+    )
+    parser.add_argument("--modules", nargs="+", default=CORE_MODULES)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="largest allowed import time of any module",
+    )
+    parser.add_argument(
+        "--output", help="file to save the results to, for a later --compare"
+    )
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed relative slowdown against --compare before failing",
+    )
+    args = parser.parse_args()
+
+    results = [best_of(module, args.repeats) for module in args.modules]
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = {result["module"]: result["ms"] for result in json.load(file)}
+
+    failures: List[str] = []
+    print(f"{'module':>44} {'ms':>8} {'baseline':>9}  loaded")
+    for result in results:
+        module, ms = result["module"], result["ms"]
+        previous = baseline.get(module)
+        print(
+            f"{module:>44} {ms:>8.1f} "
+            f"{'' if previous is None else f'{previous:.1f}':>9}  {' '.join(result['loaded'])}"
+        )
+        if result["loaded"]:
+            failures.append(f"{module} loads {', '.join(result['loaded'])}")
+        if args.budget_ms is not None and ms > args.budget_ms:
+            failures.append(f"{module} takes {ms:.1f} ms > {args.budget_ms:.1f} ms")
+        if previous is not None and ms > previous * (1 + args.tolerance):
+            failures.append(f"{module} takes {ms:.1f} ms, {previous:.1f} ms before")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,85 @@
+import argparse
+import time
+from typing import Iterator, List, Tuple
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from object_tracking.algorithms.matching import MATCHERS, get_matcher
+from object_tracking.algorithms.object_detection import BoundingBoxMatcher
+from object_tracking.utils.synthetic import generate_scene
+
+
+def time_call(fn, A: np.ndarray, repeats: int) -> float:
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(A)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def random_problems(
+    sizes: List[int], rng: np.random.Generator
+) -> Iterator[Tuple[str, List[np.ndarray]]]:
+    for n in sizes:
+        for shape in [(n, n), (n, n + n // 2), (n + n // 2, n)]:
+            yield f"random {shape}", [rng.random(shape)]
+
+
+def scene_problems(
+    sizes: List[int], frames: int, seed: int
+) -> Iterator[Tuple[str, List[np.ndarray]]]:
+    for n in sizes:
+        # Scale the scene with the object count to keep the density constant
+        side = int(200 * np.sqrt(n))
+        detections, _ = generate_scene(
+            num_objects=n, num_frames=frames, width=side, height=side, seed=seed
+        )
+        cost_matrices = []
+
+        def record(A: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            cost_matrices.append(A)
+            return linear_sum_assignment(A)
+
+        BoundingBoxMatcher(None, 0.2, 30, 30, matcher=record).fit_columnar(detections)
+        # The first frame has no tracks yet
+        yield f"scene n={n}", [A for A in cost_matrices if A.size]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the speed and optimality gap of the assignment backends against "
+        "scipy.optimize.linear_sum_assignment on random and tracking cost matrices."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--matchers", nargs="+", default=list(MATCHERS), choices=list(MATCHERS)
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    matchers = {name: get_matcher(name) for name in args.matchers}
+    problems = list(random_problems(args.sizes, rng)) + list(
+        scene_problems(args.sizes, args.frames, args.seed)
+    )
+
+    print(
+        f"{'problem':>22} {'matcher':>12} {'ms/call':>10} {'vs scipy':>9} {'gap (%)':>9}"
+    )
+    for problem, cost_matrices in problems:
+        scipy_seconds = np.mean(
+            [time_call(linear_sum_assignment, A, args.repeats) for A in cost_matrices]
+        )
+        optimum = sum(A[linear_sum_assignment(A)].sum() for A in cost_matrices)
+        for name, matcher in matchers.items():
+            seconds = np.mean(
+                [time_call(matcher, A, args.repeats) for A in cost_matrices]
+            )
+            cost = sum(A[matcher(A)].sum() for A in cost_matrices)
+            gap = (cost / optimum - 1) * 100 if optimum > 0 else 0.0
+            print(
+                f"{problem:>22} {name:>12} {seconds * 1e3:>10.3f} "
+                f"{seconds / scipy_seconds:>9.1f} {gap:>9.4f}"
+            )
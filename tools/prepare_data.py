@@ -1,4 +1,4 @@
-from a3.utils import crop_video_dimensions
+from object_tracking.utils.io import crop_video_dimensions
 
 if __name__ == "__main__":
     source_video = "../data/original/commonwealth.mp4"